@@ -1,9 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
+import queue
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from datetime import datetime
+from typing import Iterator
 from werkzeug.utils import secure_filename
 
 # Import our services
@@ -12,7 +17,18 @@ from services.validation_service import ValidationService
 from services.pdf_processing_service import PDFProcessingService
 from services.text_summarization_service import TextSummarizationService
 from services.sealion_service import SEALionService
+from services.job_queue_service import JobQueueService, FINISHED_STATES
+from services.llm_providers import cached_response_text, get_llm_providers, store_response_text
+from services.provider_router import get_provider_router
+from services.model_registry import get_model_registry
 from utils.error_handler import handle_error
+from utils.upload_spool import SpooledUpload
+from utils.response_cache import get_response_cache
+from utils.similarity_cache import SimilarityCache
+from utils.single_flight import SingleFlight
+from utils.warmup import WarmupManager
+from utils.llm_usage import usage_tracker
+from utils.sse import format_sse, SSE_HEADERS
 from config.cultural_contexts import CULTURAL_CONTEXTS
 
 # Load environment variables
@@ -35,6 +51,9 @@ allowed_origins = [
 ]
 CORS(app, origins=allowed_origins)
 
+# Uploads larger than this are spooled to disk and memory-mapped
+PDF_SPOOL_THRESHOLD_BYTES = int(os.getenv('PDF_SPOOL_THRESHOLD_BYTES', str(2 * 1024 * 1024)))
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -46,6 +65,65 @@ pdf_service = PDFProcessingService()
 summarization_service = TextSummarizationService()
 sealion_service = SEALionService()
 
+# Circuit breakers per provider; open circuits are probed in the background instead of with user requests
+provider_router = get_provider_router()
+
+# Services start without network calls; connection tests and model selection run in the background
+warmup = WarmupManager()
+if cultural_service.model:
+    warmup.register('gemini', cultural_service.probe)
+if summarization_service.model:
+    warmup.register('gemini_summarization', summarization_service.warm_up)
+if sealion_service.is_available():
+    warmup.register('sealion', sealion_service.warm_up)
+
+# Adaptations reused for near-duplicate messages within the same cultural context
+adaptation_cache = SimilarityCache(
+    threshold=float(os.getenv('ADAPTATION_CACHE_THRESHOLD', '0.85')),
+    max_entries_per_context=int(os.getenv('ADAPTATION_CACHE_ENTRIES', '256')),
+    audit_rate=float(os.getenv('ADAPTATION_CACHE_AUDIT_RATE', '0.05'))
+)
+
+# Concurrent identical adaptation requests share one provider call
+adaptation_flight = SingleFlight()
+
+# Per-provider caps on concurrent adaptation calls, shared by all endpoints
+provider_limits = {
+    'sealion': threading.BoundedSemaphore(int(os.getenv('SEALION_MAX_CONCURRENCY', '4'))),
+    'gemini': threading.BoundedSemaphore(int(os.getenv('GEMINI_MAX_CONCURRENCY', '4')))
+}
+
+# Slow adaptations are hedged to the other provider after this percentile of the primary's recent latency
+ADAPTATION_HEDGE_PERCENTILE = float(os.getenv('ADAPTATION_HEDGE_PERCENTILE', '95'))
+ADAPTATION_HEDGE_MIN_DELAY_SECONDS = float(os.getenv('ADAPTATION_HEDGE_MIN_DELAY_SECONDS', '1'))
+ADAPTATION_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv('ADAPTATION_HEDGE_DEFAULT_DELAY_SECONDS', '5'))
+
+# Adaptation services by provider name
+adaptation_services = {
+    'sealion': sealion_service,
+    'gemini': cultural_service
+}
+
+# Threads that dispatch multi-context adaptations; provider_limits bounds the actual calls
+fanout_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('ADAPTATION_FANOUT_WORKERS', '16')),
+    thread_name_prefix='adaptation'
+)
+
+@app.before_request
+def start_usage_accounting():
+    """Charge LLM calls made while serving this request to its endpoint and cultural context"""
+    endpoint = request.url_rule.rule if request.url_rule else request.path
+    data = request.get_json(silent=True) if request.is_json else None
+    context = (data.get('context') if isinstance(data, dict) else None) or request.form.get('context')
+    g.usage_handle = usage_tracker.start_request(endpoint, context or None)
+
+@app.teardown_request
+def finish_usage_accounting(error=None):
+    handle = g.pop('usage_handle', None)
+    if handle is not None:
+        usage_tracker.finish_request(handle)
+
 @app.route('/', methods=['GET'])
 def root():
     """Root endpoint"""
@@ -55,9 +133,14 @@ def root():
         'version': '1.0.0',
         'endpoints': [
             '/api/health',
+            '/api/metrics',
             '/api/cultural-adaptation/generate',
+            '/api/cultural-adaptation/generate/stream',
+            '/api/cultural-adaptation/generate-batch',
             '/api/cultural-adaptation/contexts',
             '/api/extract-pdf',
+            '/api/extract-pdf/stream',
+            '/api/extract-pdf/jobs',
             '/api/document/upload',
             '/api/document/analyze',
             '/api/document/process'
@@ -67,8 +150,9 @@ def root():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint with AI service status"""
-    # Check Gemini availability
-    gemini_available = pdf_service.model is not None
+    # Configured providers count as available while their circuit admits calls
+    gemini_available = pdf_service.model is not None and provider_router.is_available('gemini')
+    sealion_available = sealion_service.is_available() and provider_router.is_available('sealion')
     
     return jsonify({
         'status': 'OK',
@@ -77,10 +161,11 @@ def health_check():
         'version': '1.0.0',
         'ai_services': {
             'gemini_available': gemini_available,
-            'sealion_available': sealion_service.is_available(),
-            'primary_service': 'Gemini' if gemini_available else ('SEA-Lion' if sealion_service.is_available() else 'None'),
+            'sealion_available': sealion_available,
+            'primary_service': 'Gemini' if gemini_available else ('SEA-Lion' if sealion_available else 'None'),
             'pdf_analysis': 'Gemini AI' if gemini_available else 'Basic extraction'
         },
+        'warmup': warmup.get_status(),
         'features': {
             'pdf_processing': True,
             'cultural_adaptation': True,
@@ -89,6 +174,141 @@ def health_check():
         }
     }), 200
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Runtime counters for caches and processing pipelines"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': {
+                'timestamp': datetime.now().isoformat(),
+                'extraction_cache': pdf_service.extraction_cache.get_stats(),
+                'language_detection': pdf_service.language_detector.get_stats(),
+                'boilerplate_filter': pdf_service.get_boilerplate_stats(),
+                'job_queue': job_queue_service.get_stats(),
+                'summarization': summarization_service.get_stats(),
+                'llm_response_cache': get_response_cache().get_stats(),
+                'adaptation_similarity_cache': adaptation_cache.get_stats(),
+                'adaptation_single_flight': adaptation_flight.get_stats(),
+                'sealion_http': sealion_service.get_stats(),
+                'llm_providers': get_llm_providers().get_stats(),
+                'provider_router': provider_router.get_stats(),
+                'adaptation_hedging': get_llm_providers().get_hedge_stats(),
+                'gemini_models': get_model_registry().get_stats(),
+                'llm_usage': usage_tracker.get_stats()
+            }
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Error in get_metrics: {str(e)}")
+        return handle_error(e)
+
+def select_adaptation_provider() -> str:
+    """SEA-Lion when configured and its circuit is closed, otherwise Gemini"""
+    candidates = ['sealion', 'gemini'] if sealion_service.is_available() else ['gemini']
+    return provider_router.select(candidates)
+
+def hedge_adaptation(message: str, context: str, primary: str):
+    """
+    Adapt on the primary provider, hedging to the other one if the primary is slower than usual
+    
+    Returns:
+        tuple: (adapted message, winning provider), or None if no healthy secondary can take the hedge
+    
+    Raises:
+        Exception: If both providers failed
+    """
+    if ADAPTATION_HEDGE_PERCENTILE <= 0:
+        return None
+    
+    secondary = 'gemini' if primary == 'sealion' else 'sealion'
+    calls = [adaptation_services[name].build_adaptation_call(message, context) for name in (primary, secondary)]
+    if None in calls or not provider_router.is_available(secondary):
+        return None
+    
+    # A Gemini answer cached by the non-hedged path is reused before any call is made
+    gemini_call = calls[0] if primary == 'gemini' else calls[1]
+    if primary == 'gemini':
+        adapted = cultural_service.finish_adaptation(cached_response_text(gemini_call[2]['model'], gemini_call[1]))
+        if adapted:
+            return adapted, primary
+    
+    llm_providers = get_llm_providers()
+    hedge_after = llm_providers.hedge_delay(
+        primary,
+        ADAPTATION_HEDGE_PERCENTILE,
+        ADAPTATION_HEDGE_DEFAULT_DELAY_SECONDS,
+        ADAPTATION_HEDGE_MIN_DELAY_SECONDS
+    )
+    result, hedged = llm_providers.generate_hedged(
+        calls[0], calls[1], hedge_after, secondary_limiter=provider_limits[secondary]
+    )
+    
+    # Same cleanup and response caching as the non-hedged path for the provider that answered
+    adapted = adaptation_services[result.provider].finish_adaptation(result.text)
+    if not adapted:
+        raise RuntimeError(f"{result.provider} returned an empty adaptation")
+    
+    if result.provider == 'gemini':
+        store_response_text(gemini_call[2]['model'], gemini_call[1], result.text)
+    
+    if hedged:
+        logger.info(f"Adaptation for {context} hedged after {hedge_after:.2f}s, answered by {result.provider}")
+    return adapted, result.provider
+
+def adapt_message(message: str, context: str) -> tuple:
+    """
+    Culturally adapt a message, reusing cached and in-flight results where possible
+    
+    Args:
+        message (str): Validated medical message
+        context (str): Cultural context
+    
+    Returns:
+        tuple: (adapted message, source) where source is 'cache', 'coalesced', 'sealion', 'gemini' or 'fallback'
+    """
+    # Near-duplicates of earlier messages reuse their adaptation
+    adapted_message = adaptation_cache.get(message, context)
+    if adapted_message is not None:
+        logger.info(f"Reusing cached adaptation for near-duplicate message in {context}")
+        usage_tracker.record('adaptation_cache', '', 0, 0, 0.0, cache_status='similarity')
+        return adapted_message, 'cache'
+    
+    # Generate adaptation - use SEA-Lion if healthy, fallback to Gemini
+    provider = select_adaptation_provider()
+    
+    def generate():
+        with provider_limits[provider]:
+            try:
+                hedged = hedge_adaptation(message, context, provider)
+            except Exception as e:
+                logger.warning(f"Hedged adaptation failed on both providers: {str(e)}")
+                hedged = (adaptation_services[provider].get_fallback_adaptation(message, context), 'fallback')
+            
+            if hedged is not None:
+                adapted, source = hedged
+            else:
+                if provider == 'sealion':
+                    logger.info("Using SEA-Lion for cultural adaptation")
+                    adapted = sealion_service.try_cultural_adaptation(message, context)
+                else:
+                    logger.info("Using Gemini for cultural adaptation")
+                    adapted = cultural_service.try_adaptation(message, context)
+                
+                source = provider
+                if adapted is None:
+                    adapted, source = adaptation_services[provider].get_fallback_adaptation(message, context), 'fallback'
+        
+        # Template fallbacks embed the original message verbatim and are not worth caching
+        if source != 'fallback':
+            adaptation_cache.set(message, context, adapted)
+        
+        return adapted, source
+    
+    # Identical requests arriving while this one is in flight wait for it instead of calling the provider
+    (adapted_message, source), shared = adaptation_flight.do((message, context, provider), generate)
+    return adapted_message, 'coalesced' if shared else source
+
 @app.route('/api/cultural-adaptation/generate', methods=['POST'])
 def generate_adaptation():
     """Generate culturally adapted medical message"""
@@ -127,13 +347,7 @@ def generate_adaptation():
                 'error': {'message': validation_result['message']}
             }), 400
         
-        # Generate adaptation - use SEA-Lion if available, fallback to Gemini
-        if sealion_service.is_available():
-            logger.info("Using SEA-Lion for cultural adaptation")
-            adapted_message = sealion_service.generate_cultural_adaptation(message, context)
-        else:
-            logger.info("Using Gemini for cultural adaptation")
-            adapted_message = cultural_service.generate_adaptation(message, context)
+        adapted_message, source = adapt_message(message, context)
         
         return jsonify({
             'success': True,
@@ -141,6 +355,8 @@ def generate_adaptation():
                 'adapted_message': adapted_message,
                 'original_message': message,
                 'cultural_context': context,
+                'cached': source == 'cache',
+                'coalesced': source == 'coalesced',
                 'timestamp': datetime.now().isoformat()
             }
         }), 200
@@ -149,6 +365,247 @@ def generate_adaptation():
         logger.error(f"Error in generate_adaptation: {str(e)}")
         return handle_error(e)
 
+# Marks the end of a provider stream read by read_upstream
+_STREAM_DONE = object()
+
+def read_upstream(limiter, tokens: Iterator[str]) -> Iterator[str]:
+    """
+    Read a provider token stream on its own thread, holding the provider's limiter only while reading
+    
+    Chunks are buffered for the caller, so the slot is freed as soon as the
+    provider finishes instead of when a slow client has downloaded every event.
+    Provider errors are re-raised to the caller; closing the returned generator
+    (client disconnect) stops the upstream read.
+    """
+    chunks = queue.Queue()
+    stopped = threading.Event()
+    
+    def pump():
+        result = _STREAM_DONE
+        try:
+            with limiter:
+                try:
+                    for chunk in tokens:
+                        chunks.put(chunk)
+                        if stopped.is_set():
+                            break
+                finally:
+                    tokens.close()
+        except Exception as e:
+            result = e
+        chunks.put(result)
+    
+    threading.Thread(target=usage_tracker.wrap(pump), name='adaptation-stream', daemon=True).start()
+    
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is _STREAM_DONE:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        stopped.set()
+
+@app.route('/api/cultural-adaptation/generate/stream', methods=['POST'])
+def generate_adaptation_stream():
+    """Generate culturally adapted medical message, streaming provider tokens as Server-Sent Events"""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': {'message': 'No JSON data provided'}
+            }), 400
+        
+        message = data.get('message', '').strip()
+        context = data.get('context', '').strip()
+        
+        # Validate input
+        if not message:
+            return jsonify({
+                'success': False,
+                'error': {'message': 'Message is required'}
+            }), 400
+        
+        if not context:
+            return jsonify({
+                'success': False,
+                'error': {'message': 'Cultural context is required'}
+            }), 400
+        
+        validation_result = validation_service.validate_message(message)
+        if not validation_result['valid']:
+            return jsonify({
+                'success': False,
+                'error': {'message': validation_result['message']}
+            }), 400
+    
+    except Exception as e:
+        logger.error(f"Error in generate_adaptation_stream: {str(e)}")
+        return handle_error(e)
+    
+    def generate_events():
+        yield format_sse('start', {'original_message': message, 'cultural_context': context})
+        
+        # Near-duplicates of earlier messages are sent in one piece
+        adapted_message = adaptation_cache.get(message, context)
+        if adapted_message is not None:
+            yield format_sse('token', {'text': adapted_message})
+            yield format_sse('done', {'adapted_message': adapted_message, 'cultural_context': context, 'source': 'cache'})
+            return
+        
+        # Stream from SEA-Lion if healthy, otherwise Gemini
+        if select_adaptation_provider() == 'sealion':
+            provider, service, stream_tokens = 'sealion', sealion_service, sealion_service.stream_cultural_adaptation
+        else:
+            provider, service, stream_tokens = 'gemini', cultural_service, cultural_service.stream_adaptation
+        
+        parts = []
+        source = provider
+        try:
+            upstream = provider_router.guard_stream(provider, stream_tokens(message, context))
+            for text_chunk in read_upstream(provider_limits[provider], upstream):
+                parts.append(text_chunk)
+                yield format_sse('token', {'text': text_chunk})
+            
+            adapted_message = ''.join(parts).strip()
+            if not adapted_message:
+                raise RuntimeError(f"Empty response from {provider}")
+        
+        except Exception as e:
+            logger.warning(f"{provider} adaptation stream failed: {str(e)}")
+            
+            # Clients discard any partial tokens on reset; the template fallback follows
+            adapted_message = service.get_fallback_adaptation(message, context)
+            source = 'fallback'
+            yield format_sse('reset', {'reason': 'fallback', 'source': source})
+            yield format_sse('token', {'text': adapted_message})
+        
+        # Only model output is cached, never the template fallback
+        if source != 'fallback':
+            adaptation_cache.set(message, context, adapted_message)
+        
+        yield format_sse('done', {'adapted_message': adapted_message, 'cultural_context': context, 'source': source})
+    
+    return Response(stream_with_context(generate_events()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+def adapt_for_context(message: str, context: str) -> dict:
+    """Adapt a message for one context, reporting failures per context instead of raising"""
+    usage_tracker.set_context(context)
+    
+    try:
+        adapted_message, source = adapt_message(message, context)
+        return {
+            'success': True,
+            'cultural_context': context,
+            'adapted_message': adapted_message,
+            'source': source
+        }
+    
+    except Exception as e:
+        logger.error(f"Error adapting message for {context}: {str(e)}")
+        return {
+            'success': False,
+            'cultural_context': context,
+            'error': str(e)
+        }
+
+@app.route('/api/cultural-adaptation/generate-batch', methods=['POST'])
+def generate_adaptation_batch():
+    """Adapt one message for several cultural contexts concurrently"""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': {'message': 'No JSON data provided'}
+            }), 400
+        
+        message = data.get('message', '').strip()
+        contexts = data.get('contexts') or [context['value'] for context in CULTURAL_CONTEXTS]
+        stream = bool(data.get('stream', False))
+        
+        if not message:
+            return jsonify({
+                'success': False,
+                'error': {'message': 'Message is required'}
+            }), 400
+        
+        if not isinstance(contexts, list) or not all(isinstance(context, str) and context.strip() for context in contexts):
+            return jsonify({
+                'success': False,
+                'error': {'message': 'Contexts must be a list of context names'}
+            }), 400
+        
+        # Drop duplicates but keep the requested order
+        contexts = list(dict.fromkeys(context.strip() for context in contexts))
+        
+        for context in contexts:
+            context_validation = validation_service.validate_cultural_context(context)
+            if not context_validation['valid']:
+                return jsonify({
+                    'success': False,
+                    'error': {'message': context_validation['message']}
+                }), 400
+        
+        validation_result = validation_service.validate_message(message)
+        if not validation_result['valid']:
+            return jsonify({
+                'success': False,
+                'error': {'message': validation_result['message']}
+            }), 400
+        
+        logger.info(f"Fanning out adaptation to {len(contexts)} contexts")
+        futures = {
+            fanout_executor.submit(usage_tracker.wrap(adapt_for_context), message, context): context
+            for context in contexts
+        }
+    
+    except Exception as e:
+        logger.error(f"Error in generate_adaptation_batch: {str(e)}")
+        return handle_error(e)
+    
+    if stream:
+        # Each adaptation is sent as soon as it completes, in completion order
+        def cancel_pending():
+            # Adaptations that have not started yet would otherwise still queue for provider slots
+            for future in futures:
+                future.cancel()
+        
+        def generate_events():
+            try:
+                yield format_sse('start', {'original_message': message, 'contexts': contexts})
+                for future in as_completed(futures):
+                    yield format_sse('adaptation', future.result())
+                yield format_sse('done', {'count': len(futures), 'timestamp': datetime.now().isoformat()})
+            finally:
+                cancel_pending()
+        
+        response = Response(stream_with_context(generate_events()), mimetype='text/event-stream', headers=SSE_HEADERS)
+        # The generator never starts if the client disconnects first
+        response.call_on_close(cancel_pending)
+        return response
+    
+    try:
+        results = {futures[future]: future.result() for future in as_completed(futures)}
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'original_message': message,
+                'adaptations': [results[context] for context in contexts],
+                'timestamp': datetime.now().isoformat()
+            }
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Error in generate_adaptation_batch: {str(e)}")
+        return handle_error(e)
+
 @app.route('/api/cultural-adaptation/contexts', methods=['GET'])
 def get_cultural_contexts():
     """Get available cultural contexts"""
@@ -164,6 +621,105 @@ def get_cultural_contexts():
         logger.error(f"Error in get_cultural_contexts: {str(e)}")
         return handle_error(e)
 
+def build_pdf_response_data(file_name: str, extraction_result: dict, summary_result: dict,
+                            context: str, target_language: str) -> dict:
+    """Build the /api/extract-pdf response payload from extraction and analysis results"""
+    # Build enhanced response with Gemini analysis
+    if summary_result.get('success', False):
+        response_data = {
+            'summary': summary_result.get('summary', 'Content extracted successfully'),
+            'fileName': file_name,
+            'detectedLanguage': extraction_result.get('detected_language', 'English'),
+            'outputLanguage': target_language,
+            'wordCount': extraction_result.get('word_count', len(extraction_result['text'].split())),
+            'culturalContext': context,
+            'analysisSource': summary_result.get('source', 'gemini'),
+            'extractionCached': extraction_result.get('cache_hit', False),
+            'boilerplate': extraction_result.get('boilerplate'),
+            'processingSuccess': True
+        }
+    else:
+        # Fallback response if analysis fails
+        response_data = {
+            'summary': f"Document processed successfully. Content extracted from {file_name}. Please review the document with your healthcare provider for detailed information.",
+            'fileName': file_name,
+            'detectedLanguage': extraction_result.get('detected_language', 'English'),
+            'outputLanguage': target_language,
+            'wordCount': extraction_result.get('word_count', len(extraction_result['text'].split())),
+            'culturalContext': context,
+            'analysisSource': 'basic',
+            'processingSuccess': False,
+            'error': summary_result.get('error', 'Analysis service unavailable')
+        }
+    
+    return response_data
+
+def run_pdf_pipeline(upload, file_name: str, context: str, target_language: str, stage=None) -> tuple:
+    """
+    Extract, analyze and culturally adapt an uploaded PDF
+    
+    Shared by the synchronous endpoint and the background job workers.
+    
+    Args:
+        upload: Seekable PDF file object
+        file_name (str): Original file name
+        context (str): Cultural context
+        target_language (str): Target language code
+        stage: Optional callable returning a context manager that times a named stage
+    
+    Returns:
+        tuple: (response payload, HTTP status code)
+    """
+    stage = stage or (lambda name: nullcontext())
+    
+    with stage('extraction'):
+        extraction_result = pdf_service.extract_text_from_pdf(upload, target_language)
+    
+    if not extraction_result['success']:
+        return {
+            'success': False,
+            'error': {'message': f"PDF extraction failed: {extraction_result['error']}"}
+        }, 400
+    
+    extracted_text = extraction_result['text']
+    
+    # Generate detailed summary with explanations - use Gemini as primary
+    logger.info(f"Calling Gemini for PDF analysis, text length: {len(extracted_text)}")
+    logger.info(f"Target language: {target_language}")
+    
+    # Use Gemini API for PDF analysis and output, unless its circuit is open and SEA-Lion can take over
+    if provider_router.is_available('gemini') or not sealion_service.is_available():
+        logger.info("Using Gemini AI for PDF analysis and summarization")
+        with stage('analysis'):
+            summary_result = pdf_service.analyze_with_gemini(
+                text=extracted_text,
+                cultural_context=context,
+                target_language=target_language
+            )
+    else:
+        logger.info("Gemini circuit open, skipping straight to SEA-Lion")
+        summary_result = {'success': False, 'error': 'Gemini circuit open'}
+    
+    # Fallback to SEA-Lion if Gemini fails
+    if not summary_result.get('success', False) and sealion_service.is_available():
+        logger.info("Gemini failed, falling back to SEA-Lion")
+        with stage('fallback'):
+            summary = sealion_service.generate_pdf_summary(
+                text=extracted_text,
+                cultural_context=context,
+                target_language=target_language
+            )
+        summary_result = {'summary': summary, 'success': True}
+    
+    logger.info(f"Analysis result: {summary_result}")
+    
+    response_data = build_pdf_response_data(file_name, extraction_result, summary_result, context, target_language)
+    
+    return {
+        'success': True,
+        'data': response_data
+    }, 200
+
 @app.route('/api/extract-pdf', methods=['POST'])
 def extract_pdf():
     """Extract and culturally adapt PDF content"""
@@ -181,76 +737,195 @@ def extract_pdf():
         
         logger.info(f"Processing PDF: {file.filename}, context: {context}, language: {target_language}")
         
-        # Extract text from PDF
-        extraction_result = pdf_service.extract_text_from_pdf(file, target_language)
+        # Extract text from PDF, reading large uploads through a memory-mapped spool file
+        with SpooledUpload(file.stream, threshold=PDF_SPOOL_THRESHOLD_BYTES) as upload:
+            payload, status_code = run_pdf_pipeline(upload, file.filename, context, target_language)
         
-        if not extraction_result['success']:
+        return jsonify(payload), status_code
+        
+    except Exception as e:
+        logger.error(f"Error in extract_pdf: {str(e)}")
+        return handle_error(e)
+
+@app.route('/api/extract-pdf/stream', methods=['POST'])
+def extract_pdf_stream():
+    """Extract and culturally adapt PDF content, streaming progress as Server-Sent Events"""
+    try:
+        # Check if file is present
+        if 'pdf' not in request.files:
             return jsonify({
                 'success': False,
-                'error': {'message': f"PDF extraction failed: {extraction_result['error']}"}
+                'error': {'message': 'No PDF file uploaded'}
             }), 400
         
-        extracted_text = extraction_result['text']
+        file = request.files['pdf']
+        file_name = file.filename
+        context = request.form.get('context', 'general')
+        target_language = request.form.get('target_language', 'en')
         
-        # Generate detailed summary with explanations - use Gemini as primary
-        logger.info(f"Calling Gemini for PDF analysis, text length: {len(extracted_text)}")
-        logger.info(f"Target language: {target_language}")
+        logger.info(f"Streaming PDF: {file_name}, context: {context}, language: {target_language}")
         
-        # Use Gemini API for PDF analysis and output
-        logger.info("Using Gemini AI for PDF analysis and summarization")
-        summary_result = pdf_service.analyze_with_gemini(
-            text=extracted_text,
-            cultural_context=context,
-            target_language=target_language
-        )
-        
-        # Fallback to SEA-Lion if Gemini fails
-        if not summary_result.get('success', False) and sealion_service.is_available():
-            logger.info("Gemini failed, falling back to SEA-Lion")
-            summary = sealion_service.generate_pdf_summary(
-                text=extracted_text,
-                cultural_context=context,
-                target_language=target_language
-            )
-            summary_result = {'summary': summary, 'success': True}
-        
-        logger.info(f"Analysis result: {summary_result}")
-        
-        # Build enhanced response with Gemini analysis
-        if summary_result.get('success', False):
-            response_data = {
-                'summary': summary_result.get('summary', 'Content extracted successfully'),
-                'fileName': file.filename,
-                'detectedLanguage': extraction_result.get('detected_language', 'English'),
-                'outputLanguage': target_language,
-                'wordCount': len(extracted_text.split()),
-                'culturalContext': context,
-                'analysisSource': summary_result.get('source', 'gemini'),
-                'processingSuccess': True
-            }
-        else:
-            # Fallback response if analysis fails
-            response_data = {
-                'summary': f"Document processed successfully. Content extracted from {file.filename}. Please review the document with your healthcare provider for detailed information.",
-                'fileName': file.filename,
-                'detectedLanguage': extraction_result.get('detected_language', 'English'),
-                'outputLanguage': target_language,
-                'wordCount': len(extracted_text.split()),
-                'culturalContext': context,
-                'analysisSource': 'basic',
-                'processingSuccess': False,
-                'error': summary_result.get('error', 'Analysis service unavailable')
+        upload = SpooledUpload(file.stream, threshold=PDF_SPOOL_THRESHOLD_BYTES)
+    
+    except Exception as e:
+        logger.error(f"Error in extract_pdf_stream: {str(e)}")
+        return handle_error(e)
+    
+    def generate_events():
+        try:
+            yield format_sse('start', {'fileName': file_name, 'culturalContext': context, 'outputLanguage': target_language})
+            
+            # Page count, per-page progress and detected language as extraction proceeds
+            extraction_result = None
+            for event in pdf_service.stream_extraction(upload):
+                event_name = event.pop('event')
+                if event_name == 'extracted':
+                    extraction_result = event['result']
+                else:
+                    yield format_sse(event_name, event)
+            
+            if not extraction_result['success']:
+                yield format_sse('error', {'message': f"PDF extraction failed: {extraction_result['error']}"})
+                return
+            
+            extracted_text = extraction_result['text']
+            yield format_sse('extracted', {
+                'wordCount': extraction_result.get('word_count'),
+                'pageCount': extraction_result.get('page_count'),
+                'extractionCached': extraction_result.get('cache_hit', False),
+                'boilerplate': extraction_result.get('boilerplate')
+            })
+            
+            # Stream the Gemini analysis token by token
+            summary_parts = []
+            summary_result = {'success': False, 'error': 'Analysis service unavailable'}
+            try:
+                gemini_tokens = pdf_service.stream_analysis_with_gemini(extracted_text, context, target_language)
+                for text_chunk in provider_router.guard_stream('gemini', gemini_tokens):
+                    summary_parts.append(text_chunk)
+                    yield format_sse('token', {'text': text_chunk})
+                
+                summary_result = {'success': True, 'summary': ''.join(summary_parts), 'source': 'gemini'}
+            
+            except Exception as e:
+                logger.warning(f"Gemini stream failed: {str(e)}")
+                summary_result = {'success': False, 'error': str(e)}
+                
+                # Fallback to SEA-Lion if Gemini fails; clients discard any partial tokens on reset
+                if sealion_service.is_available():
+                    logger.info("Gemini failed, falling back to SEA-Lion")
+                    summary = sealion_service.generate_pdf_summary(
+                        text=extracted_text,
+                        cultural_context=context,
+                        target_language=target_language
+                    )
+                    summary_result = {'summary': summary, 'success': True, 'source': 'sealion'}
+                    yield format_sse('reset', {'reason': 'fallback', 'analysisSource': 'sealion'})
+                    yield format_sse('token', {'text': summary})
+            
+            yield format_sse('done', build_pdf_response_data(file_name, extraction_result, summary_result, context, target_language))
+        
+        except Exception as e:
+            logger.error(f"Error in extract_pdf_stream: {str(e)}")
+            yield format_sse('error', {'message': 'Internal server error', 'details': str(e)})
+        
+        finally:
+            upload.close()
+    
+    response = Response(stream_with_context(generate_events()), mimetype='text/event-stream', headers=SSE_HEADERS)
+    
+    # The generator never starts if the client disconnects first; release the spool with the response
+    response.call_on_close(upload.close)
+    return response
+
+def process_pdf_job(upload, file_name: str, context: str, target_language: str, stage) -> dict:
+    """Run a queued PDF job through the synchronous pipeline and return its response payload"""
+    with usage_tracker.request('/api/extract-pdf/jobs (worker)', context):
+        payload, _ = run_pdf_pipeline(upload, file_name, context, target_language, stage)
+    return payload
+
+# Background PDF jobs reuse the synchronous pipeline
+job_queue_service = JobQueueService(process_pdf_job)
+
+@app.route('/api/extract-pdf/jobs', methods=['POST'])
+def submit_pdf_job():
+    """Queue a PDF for background analysis and return its job ID immediately"""
+    try:
+        # Check if file is present
+        if 'pdf' not in request.files:
+            return jsonify({
+                'success': False,
+                'error': {'message': 'No PDF file uploaded'}
+            }), 400
+        
+        file = request.files['pdf']
+        context = request.form.get('context', 'general')
+        target_language = request.form.get('target_language', 'en')
+        
+        job_id = job_queue_service.submit(file.stream, file.filename, context, target_language)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'jobId': job_id,
+                'status': 'queued',
+                'statusUrl': f"/api/extract-pdf/jobs/{job_id}",
+                'eventsUrl': f"/api/extract-pdf/jobs/{job_id}/events"
             }
+        }), 202
+    
+    except Exception as e:
+        logger.error(f"Error in submit_pdf_job: {str(e)}")
+        return handle_error(e)
+
+@app.route('/api/extract-pdf/jobs/<job_id>', methods=['GET'])
+def get_pdf_job(job_id):
+    """Poll the state of a PDF job; finished jobs include the /api/extract-pdf payload as result"""
+    try:
+        job = job_queue_service.get_job(job_id)
+        
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': {'message': 'Job not found'}
+            }), 404
         
         return jsonify({
             'success': True,
-            'data': response_data
+            'data': job
         }), 200
-        
+    
     except Exception as e:
-        logger.error(f"Error in extract_pdf: {str(e)}")
+        logger.error(f"Error in get_pdf_job: {str(e)}")
         return handle_error(e)
 
+@app.route('/api/extract-pdf/jobs/<job_id>/events', methods=['GET'])
+def subscribe_pdf_job(job_id):
+    """Stream status changes of a PDF job as Server-Sent Events until it finishes"""
+    job = job_queue_service.get_job(job_id)
+    
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': {'message': 'Job not found'}
+        }), 404
+    
+    def generate_events():
+        current = job
+        yield format_sse('status', current)
+        
+        while current is not None and current['status'] not in FINISHED_STATES:
+            previous_status = current['status']
+            current = job_queue_service.wait_for_update(job_id, previous_status)
+            
+            # Re-send the status on timeout as a keep-alive
+            if current is not None:
+                yield format_sse('status', current)
+        
+        yield format_sse('done', current or {'jobId': job_id, 'status': 'expired'})
+    
+    return Response(stream_with_context(generate_events()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
@@ -271,6 +946,20 @@ def internal_error(error):
         }
     }), 500
 
+def start_background_services():
+    """Start recovery probes, warm-up and the job queue workers"""
+    provider_router.register_probe('gemini', cultural_service.probe)
+    if sealion_service.is_available():
+        provider_router.register_probe('sealion', sealion_service.probe)
+    
+    warmup.start(enabled=os.getenv('SERVICE_WARMUP', 'true').lower() == 'true')
+    job_queue_service.start()
+
+# PDF extraction workers are spawned processes, which re-import the entry script as __mp_main__
+# (e.g. under `python app.py`); they must not claim jobs, probe providers or warm up services
+if __name__ != '__mp_main__':
+    start_background_services()
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
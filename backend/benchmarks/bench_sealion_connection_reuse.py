@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+SEA-Lion Connection Reuse Benchmark for MediTalks
+Compares one-off requests.post calls with the service's pooled keep-alive session against a local stub server
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Keep the service from making a test request at construction time
+os.environ['SEALION_API_KEY'] = ''
+
+from services.sealion_service import SEALionService
+
+RESPONSE_BODY = json.dumps({
+    'choices': [{'message': {'content': 'Take one tablet after meals.'}}]
+}).encode('utf-8')
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Chat completion endpoint that answers immediately and keeps connections alive"""
+    
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls like a real server
+    disable_nagle_algorithm = True
+    connections = 0
+    
+    def setup(self):
+        super().setup()
+        StubHandler.connections += 1
+    
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+    
+    def log_message(self, format, *args):
+        pass
+
+def run(label: str, send, requests_count: int):
+    StubHandler.connections = 0
+    started = time.perf_counter()
+    for _ in range(requests_count):
+        send()
+    elapsed = time.perf_counter() - started
+    
+    print(f"{label:<18} {elapsed * 1000:8.1f} ms   {elapsed / requests_count * 1e6:7.0f} us/request   "
+          f"connections {StubHandler.connections}")
+    return elapsed
+
+def main():
+    requests_count = int(os.getenv('BENCH_REQUESTS', '500'))
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_port}/v1"
+    
+    service = SEALionService()
+    service.api_url = api_url
+    payload = service._build_payload('Test connection', 'en', 10)
+    
+    print(f"{requests_count} chat completion requests against a local stub server")
+    print()
+    
+    one_off = run('requests.post', lambda: requests.post(
+        f"{api_url}/chat/completions", headers=service._build_headers(), json=payload, timeout=service.timeout
+    ), requests_count)
+    pooled = run('pooled session', lambda: service._post(payload), requests_count)
+    
+    server.shutdown()
+    
+    print()
+    print(f"Connection reuse speedup: {one_off / pooled:.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Summarization Modes Benchmark for MediTalks
+Compares serial, concurrent and combined analyze_and_summarize against a simulated Gemini model
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Keep the benchmark offline and make every call reach the simulated model
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['LLM_CACHE_MAX_ENTRIES'] = '0'
+
+from services.text_summarization_service import TextSummarizationService, SUMMARY_MODES
+
+SAMPLE_TEXT = (
+    "Take 500 mg paracetamol every 6 hours after meals. Do not exceed 8 tablets a day. "
+    "Drink plenty of water and rest. Return to the clinic if the fever lasts more than 3 days "
+    "or if you notice a rash, difficulty breathing or confusion. "
+) * 10
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+class SimulatedModel:
+    """Stand-in for GenerativeModel with a fixed round-trip latency"""
+    
+    model_name = 'simulated'
+    
+    def __init__(self, latency_seconds: float):
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+    
+    async def generate_content_async(self, prompt: str, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency_seconds)
+        
+        if 'JSON object' in prompt:
+            return _Response(json.dumps({
+                'summary': 'Take paracetamol after meals and see a doctor if the fever persists.',
+                'key_points': ['500 mg every 6 hours', 'No more than 8 tablets a day', 'Return after 3 days of fever']
+            }))
+        if 'key points' in prompt:
+            return _Response('- 500 mg every 6 hours\n- No more than 8 tablets a day\n- Return after 3 days of fever')
+        return _Response('Take paracetamol after meals and see a doctor if the fever persists.')
+
+def main():
+    latency = float(os.getenv('BENCH_LATENCY_SECONDS', '0.5'))
+    repeats = int(os.getenv('BENCH_REPEATS', '5'))
+    
+    service = TextSummarizationService()
+    
+    print(f"Simulated Gemini latency: {latency * 1000:.0f} ms per call, {repeats} runs each")
+    print()
+    
+    results = {}
+    for mode in SUMMARY_MODES:
+        service.model = SimulatedModel(latency)
+        timings = []
+        
+        for _ in range(repeats):
+            started = time.perf_counter()
+            result = service.analyze_and_summarize(SAMPLE_TEXT, 'en', 'medium', mode=mode)
+            timings.append(time.perf_counter() - started)
+        
+        results[mode] = min(timings)
+        print(f"{mode:<12} best {results[mode] * 1000:8.1f} ms   "
+              f"calls/run {service.model.calls / repeats:.0f}   key points {len(result['key_points'])}")
+    
+    print()
+    for mode in ('concurrent', 'combined'):
+        print(f"{mode} speedup over serial: {results['serial'] / results[mode]:.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Text Normalizer Benchmark for MediTalks
+Compares utils.text_normalizer.normalize_text with the previous regex-based _clean_text
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from utils.text_normalizer import normalize_text
+
+# Sample page mixing scripts and PDF artifacts seen in hospital leaflets
+SAMPLE_PAGE = (
+    "Take 500 mg paracetamol every 6 hours • Do not exceed 4 g/day (≈ 8 tablets).\n\n\n"
+    "ทานยาหลังอาหาร วันละ ๓ ครั้ง\u200b หากมีไข้สูงกว่า 38°C ให้ไปโรงพยาบาล\n"
+    "ញ៉ាំថ្នាំតាមការណែនាំរបស់វេជ្ជបណ្ឌិត\t(cid:12)(cid:34)\n"
+    "Uống thuốc theo chỉ định của bác sĩ — 5% glucose\n"
+    "Sila ambil ubat mengikut arahan doktor. \ufb01nal dose\u00ad age   \x0c"
+)
+
+def legacy_clean_text(text: str) -> str:
+    """Previous PDFProcessingService._clean_text implementation"""
+    if not text:
+        return ""
+    
+    import re
+    
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
+    text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}\"\'\/\\\n]', ' ', text)
+    
+    return text.strip()
+
+def build_input(target_bytes: int = 1024 * 1024) -> str:
+    """Repeat the sample page until the UTF-8 size reaches target_bytes"""
+    page_bytes = len(SAMPLE_PAGE.encode('utf-8'))
+    return SAMPLE_PAGE * (target_bytes // page_bytes + 1)
+
+def count_combining_marks(text: str) -> int:
+    """Count Thai and Khmer combining marks"""
+    return len(re.findall(r'[\u0e31\u0e34-\u0e3a\u0e47-\u0e4e\u17b4-\u17d3]', text))
+
+def main():
+    text = build_input()
+    repeats = int(os.getenv('BENCH_REPEATS', '10'))
+    
+    print(f"Input: {len(text.encode('utf-8')) / (1024 * 1024):.2f} MB, {len(text)} characters, {repeats} runs each")
+    print()
+    
+    results = {}
+    for name, func in (('legacy _clean_text', legacy_clean_text), ('normalize_text', normalize_text)):
+        best = min(timeit.repeat(lambda: func(text), number=1, repeat=repeats))
+        output = func(text)
+        results[name] = best
+        print(f"{name:<20} best {best * 1000:8.1f} ms   {len(text) / best / 1e6:6.1f} Mchar/s   "
+              f"combining marks kept: {count_combining_marks(output)} / {count_combining_marks(text)}")
+    
+    print()
+    print(f"Speedup: {results['legacy _clean_text'] / results['normalize_text']:.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""
+Medical Terms Configuration for MediTalks
+Keyword lists used for medical-content checks and fallback key point extraction
+"""
+
+# English keywords that mark a message as medical-related
+MEDICAL_KEYWORDS = [
+    'medicine', 'medication', 'doctor', 'hospital', 'clinic', 'treatment',
+    'diagnosis', 'symptoms', 'patient', 'health', 'medical', 'prescription',
+    'dose', 'dosage', 'therapy', 'surgery', 'examination', 'consultation',
+    'healthcare', 'illness', 'disease', 'condition', 'recovery', 'healing',
+    'pain', 'fever', 'infection', 'vaccine', 'immunization', 'checkup'
+]
+
+# English keywords that mark a sentence as a key point
+KEY_POINT_KEYWORDS = [
+    'medication', 'dose', 'treatment', 'doctor', 'hospital',
+    'symptoms', 'diagnosis', 'prescription', 'important', 'warning'
+]
+
+# Core medical terms per language code (medicine, doctor, hospital, symptoms, treatment)
+MEDICAL_TERMS_BY_LANGUAGE = {
+    'tl': ['gamot', 'doktor', 'ospital', 'sakit', 'lunas'],
+    'th': ['ยา', 'หมอ', 'โรงพยาบาล', 'อาการ', 'การรักษา'],
+    'km': ['ថ្នាំ', 'វេជ្ជបណ្ឌិត', 'មន្ទីរពេទ្យ', 'រោគសញ្ញា', 'ការព្យាបាល'],
+    'vi': ['thuốc', 'bác sĩ', 'bệnh viện', 'triệu chứng', 'điều trị'],
+    'ms': ['ubat', 'doktor', 'hospital', 'simptom', 'rawatan']
+}
+
+# Every multilingual term, flattened for matching
+MULTILINGUAL_MEDICAL_TERMS = [term for terms in MEDICAL_TERMS_BY_LANGUAGE.values() for term in terms]
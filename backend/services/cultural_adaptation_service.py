@@ -5,9 +5,11 @@ Handles culturally sensitive medical message adaptation using Google Gemini AI
 
 import os
 import logging
-import google.generativeai as genai
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
 from dotenv import load_dotenv
+from services.llm_providers import generate_content
+from services.model_registry import ROLE_ADAPTATION, get_model_registry
+from utils.llm_usage import usage_tracker
 
 # Load environment variables
 load_dotenv()
@@ -58,8 +60,7 @@ class CulturalAdaptationService:
                 logger.error("GEMINI_API_KEY not found in environment variables")
                 return False
             
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            self.model = get_model_registry().get_model(ROLE_ADAPTATION)
             logger.info("Gemini AI initialized successfully")
             return True
             
@@ -76,36 +77,111 @@ class CulturalAdaptationService:
             cultural_context (str): Target cultural context
             
         Returns:
-            str: Culturally adapted message
+            str: Culturally adapted message, or the template fallback if Gemini failed
+        """
+        return self.try_adaptation(message, cultural_context) or self._fallback_adaptation(message, cultural_context)
+    
+    def try_adaptation(self, message: str, cultural_context: str) -> Optional[str]:
+        """
+        Generate culturally adapted medical message with Gemini, without the template fallback
+        
+        Args:
+            message (str): Original medical message
+            cultural_context (str): Target cultural context
+        
+        Returns:
+            str: Culturally adapted message, or None if Gemini could not adapt it
         """
         try:
             if not self.model:
                 logger.warning("Gemini AI not available, using fallback adaptation")
-                return self._fallback_adaptation(message, cultural_context)
+                return None
             
             context_info = self.context_templates.get(cultural_context, {})
             
             if not context_info:
                 logger.warning(f"Unknown cultural context: {cultural_context}")
-                return self._fallback_adaptation(message, cultural_context)
+                return None
             
             # Construct prompt for Gemini
             prompt = self._build_adaptation_prompt(message, context_info)
             
             # Generate response using Gemini
-            response = self.model.generate_content(prompt)
+            response = generate_content(self.model, prompt)
             
-            if response.text:
-                adapted_message = response.text.strip()
+            adapted_message = self.finish_adaptation(response.text)
+            if adapted_message:
                 logger.info(f"Successfully adapted message for {cultural_context}")
                 return adapted_message
             else:
                 logger.warning("Gemini returned empty response")
-                return self._fallback_adaptation(message, cultural_context)
+                return None
                 
         except Exception as e:
             logger.error(f"Error generating adaptation with Gemini: {str(e)}")
-            return self._fallback_adaptation(message, cultural_context)
+            return None
+    
+    def finish_adaptation(self, text: Optional[str]) -> Optional[str]:
+        """Clean up raw Gemini adaptation text; None if nothing usable is left"""
+        return (text or '').strip() or None
+    
+    def stream_adaptation(self, message: str, cultural_context: str) -> Iterator[str]:
+        """
+        Stream a culturally adapted medical message from Gemini as it is generated
+        
+        Args:
+            message (str): Original medical message
+            cultural_context (str): Target cultural context
+        
+        Yields:
+            str: Successive pieces of the adapted message
+        
+        Raises:
+            RuntimeError: If Gemini is unavailable, the context is unknown or the response is empty
+        """
+        if not self.model:
+            raise RuntimeError('Gemini AI not available')
+        
+        context_info = self.context_templates.get(cultural_context, {})
+        if not context_info:
+            raise RuntimeError(f"Unknown cultural context: {cultural_context}")
+        
+        prompt = self._build_adaptation_prompt(message, context_info)
+        response = self.model.generate_content(prompt, stream=True)
+        chunks = usage_tracker.track_stream('gemini', self.model.model_name, prompt, (chunk.text for chunk in response))
+        
+        received = False
+        for text_chunk in chunks:
+            if text_chunk:
+                received = True
+                yield text_chunk
+        
+        if not received:
+            raise RuntimeError('Empty response from Gemini')
+    
+    def probe(self) -> bool:
+        """Cheap token-count request used as a recovery probe"""
+        if not self.model:
+            return False
+        
+        return self.model.count_tokens('ping') is not None
+    
+    def get_fallback_adaptation(self, message: str, cultural_context: str) -> str:
+        """Template adaptation used when Gemini fails"""
+        return self._fallback_adaptation(message, cultural_context)
+    
+    def build_adaptation_call(self, message: str, cultural_context: str) -> Optional[tuple]:
+        """
+        Describe an adaptation as a provider call for the LLM provider layer
+        
+        Returns:
+            tuple: (provider name, prompt, options), or None if Gemini cannot take this context
+        """
+        context_info = self.context_templates.get(cultural_context)
+        if not self.model or not context_info:
+            return None
+        
+        return 'gemini', self._build_adaptation_prompt(message, context_info), {'model': self.model}
     
     def _build_adaptation_prompt(self, message: str, context_info: Dict[str, str]) -> str:
         """Build prompt for Gemini AI"""
@@ -0,0 +1,377 @@
+"""
+Job Queue Service for MediTalks
+Runs PDF analysis in background workers fed from a persistent SQLite queue
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    file_name TEXT,
+    context TEXT,
+    target_language TEXT,
+    upload_path TEXT,
+    result TEXT,
+    error TEXT,
+    timings TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+class JobQueueService:
+    """
+    Persistent job queue with a local worker pool
+    
+    Uploads are written to disk and a row is inserted in SQLite, so queued jobs
+    survive a restart. Worker threads claim the oldest queued job with a
+    conditional UPDATE, which also keeps several gunicorn workers sharing one
+    database from running the same job twice.
+    """
+    
+    def __init__(self, process_job: Callable[..., Dict[str, Any]], db_path: Optional[str] = None,
+                 upload_dir: Optional[str] = None, workers: Optional[int] = None):
+        """
+        Args:
+            process_job: Callable(upload, file_name, context, target_language, stage) returning the
+                job result; stage(name) is a context manager that times one pipeline stage
+            db_path (str): SQLite database file
+            upload_dir (str): Directory where queued uploads are kept until processed
+            workers (int): Number of worker threads
+        """
+        data_dir = os.path.join(tempfile.gettempdir(), 'meditalks-jobs')
+        
+        self.process_job = process_job
+        self.db_path = db_path or os.getenv('JOB_QUEUE_DB', os.path.join(data_dir, 'jobs.sqlite3'))
+        self.upload_dir = upload_dir or os.getenv('JOB_UPLOAD_DIR', os.path.join(data_dir, 'uploads'))
+        self.workers = workers or int(os.getenv('JOB_WORKERS', '2'))
+        self.stale_seconds = int(os.getenv('JOB_STALE_SECONDS', '900'))
+        self.retention_seconds = int(os.getenv('JOB_RETENTION_SECONDS', '86400'))
+        
+        # Notified whenever a job is queued or changes state in this process
+        self._condition = threading.Condition()
+        self._threads = []
+        self._stage_stats = {}
+        self._stats_lock = threading.Lock()
+        self._last_stale_check = time.monotonic()
+        
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        os.makedirs(self.upload_dir, exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+        
+        self._requeue_stale_jobs()
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection per operation, committed on success and always closed"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        if self._threads:
+            return
+        
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        
+        logger.info(f"Job queue started with {self.workers} workers, database {self.db_path}")
+    
+    def submit(self, stream, file_name: str, context: str, target_language: str) -> str:
+        """
+        Persist an upload and queue it for processing
+        
+        Args:
+            stream: Readable upload stream
+            file_name (str): Original file name
+            context (str): Cultural context
+            target_language (str): Target language code
+        
+        Returns:
+            str: Job ID
+        """
+        job_id = uuid.uuid4().hex
+        upload_path = os.path.join(self.upload_dir, f"{job_id}.pdf")
+        
+        with open(upload_path, 'wb') as f:
+            shutil.copyfileobj(stream, f, 1024 * 1024)
+        
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT INTO jobs (id, status, file_name, context, target_language, upload_path, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (job_id, JOB_QUEUED, file_name, context, target_language, upload_path, time.time())
+                )
+        except Exception:
+            self._remove_upload(upload_path)
+            raise
+        
+        self._notify()
+        logger.info(f"Queued job {job_id} for {file_name}")
+        return job_id
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the state of a job
+        
+        Args:
+            job_id (str): Job ID from submit
+        
+        Returns:
+            Dict with jobId, status, timestamps, stage timings and, once finished, result or error
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            
+            if row is None:
+                return None
+            
+            job = {
+                'jobId': row['id'],
+                'status': row['status'],
+                'fileName': row['file_name'],
+                'culturalContext': row['context'],
+                'outputLanguage': row['target_language'],
+                'createdAt': row['created_at'],
+                'startedAt': row['started_at'],
+                'finishedAt': row['finished_at'],
+                'timings': json.loads(row['timings']) if row['timings'] else {}
+            }
+            
+            if row['status'] == JOB_QUEUED:
+                job['queuePosition'] = conn.execute(
+                    'SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at <= ?',
+                    (JOB_QUEUED, row['created_at'])
+                ).fetchone()[0]
+        
+        if row['result']:
+            job['result'] = json.loads(row['result'])
+        if row['error']:
+            job['error'] = row['error']
+        
+        return job
+    
+    def wait_for_update(self, job_id: str, last_status: Optional[str], timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """
+        Block until a job leaves last_status or the timeout expires
+        
+        Jobs run by another process are picked up by re-reading the database
+        every second.
+        
+        Args:
+            job_id (str): Job ID
+            last_status (str): Status the caller has already seen
+            timeout (float): Maximum seconds to wait
+        
+        Returns:
+            Current job state, or None if the job does not exist
+        """
+        deadline = time.monotonic() + timeout
+        
+        while True:
+            job = self.get_job(job_id)
+            remaining = deadline - time.monotonic()
+            
+            if job is None or job['status'] != last_status or remaining <= 0:
+                return job
+            
+            with self._condition:
+                self._condition.wait(min(remaining, 1.0))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, job counts by status and per-stage timings of this process"""
+        with self._connect() as conn:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        
+        with self._stats_lock:
+            stages = {
+                name: {
+                    'count': stats['count'],
+                    'avg_ms': round(stats['total_ms'] / stats['count'], 1),
+                    'max_ms': round(stats['max_ms'], 1)
+                }
+                for name, stats in self._stage_stats.items()
+            }
+        
+        return {
+            'queue_depth': counts.get(JOB_QUEUED, 0),
+            'running': counts.get(JOB_RUNNING, 0),
+            'completed': counts.get(JOB_COMPLETED, 0),
+            'failed': counts.get(JOB_FAILED, 0),
+            'workers': len(self._threads),
+            'stages': stages
+        }
+    
+    def _worker_loop(self):
+        """Claim and process jobs until the process exits"""
+        while True:
+            try:
+                job = self._claim_next_job()
+                
+                if job is None:
+                    self._maybe_requeue_stale_jobs()
+                    with self._condition:
+                        self._condition.wait(5.0)
+                    continue
+                
+                self._run_job(job)
+            
+            except Exception as e:
+                logger.error(f"Job worker error: {str(e)}")
+                time.sleep(1.0)
+    
+    def _claim_next_job(self) -> Optional[sqlite3.Row]:
+        """Atomically move the oldest queued job to running"""
+        with self._connect() as conn:
+            while True:
+                row = conn.execute(
+                    'SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1', (JOB_QUEUED,)
+                ).fetchone()
+                
+                if row is None:
+                    return None
+                
+                claimed = conn.execute(
+                    'UPDATE jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?',
+                    (JOB_RUNNING, time.time(), row['id'], JOB_QUEUED)
+                ).rowcount
+                conn.commit()
+                
+                # Another worker claimed it first; try the next one
+                if claimed:
+                    self._notify()
+                    return row
+    
+    def _run_job(self, job: sqlite3.Row):
+        """Process one claimed job and store its outcome"""
+        job_id = job['id']
+        timings = {}
+        
+        @contextmanager
+        def stage(name: str):
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                timings[name] = round(timings.get(name, 0) + elapsed_ms, 1)
+                self._record_stage(name, elapsed_ms)
+        
+        result = None
+        error = None
+        
+        try:
+            with open(job['upload_path'], 'rb') as upload:
+                result = self.process_job(upload, job['file_name'], job['context'], job['target_language'], stage)
+        
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            error = str(e)
+        
+        status = JOB_COMPLETED if result is not None and result.get('success', False) else JOB_FAILED
+        if status == JOB_FAILED and error is None:
+            error = (result or {}).get('error', {}).get('message', 'Processing failed')
+        
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, timings = ?, finished_at = ? WHERE id = ?',
+                (status, json.dumps(result, ensure_ascii=False) if result else None, error,
+                 json.dumps(timings), time.time(), job_id)
+            )
+        
+        self._remove_upload(job['upload_path'])
+        self._notify()
+        self._prune_finished_jobs()
+        
+        logger.info(f"Job {job_id} {status} in {sum(timings.values()):.0f} ms")
+    
+    def _record_stage(self, name: str, elapsed_ms: float):
+        """Aggregate a stage duration for get_stats"""
+        with self._stats_lock:
+            stats = self._stage_stats.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+    
+    def _maybe_requeue_stale_jobs(self):
+        """Run the stale-job check at most once a minute from idle workers"""
+        with self._stats_lock:
+            if time.monotonic() - self._last_stale_check < 60:
+                return
+            self._last_stale_check = time.monotonic()
+        
+        self._requeue_stale_jobs()
+    
+    def _requeue_stale_jobs(self):
+        """Requeue jobs left running by a worker that died mid-job"""
+        with self._connect() as conn:
+            requeued = conn.execute(
+                'UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? AND started_at < ?',
+                (JOB_QUEUED, JOB_RUNNING, time.time() - self.stale_seconds)
+            ).rowcount
+        
+        if requeued:
+            logger.warning(f"Requeued {requeued} stale jobs")
+    
+    def _prune_finished_jobs(self):
+        """Delete finished jobs older than the retention period"""
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    f"DELETE FROM jobs WHERE status IN ({', '.join('?' for _ in FINISHED_STATES)}) AND finished_at < ?",
+                    (*FINISHED_STATES, time.time() - self.retention_seconds)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to prune finished jobs: {str(e)}")
+    
+    def _remove_upload(self, upload_path: Optional[str]):
+        """Delete a persisted upload"""
+        if not upload_path:
+            return
+        
+        try:
+            os.remove(upload_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove upload {upload_path}: {str(e)}")
+    
+    def _notify(self):
+        """Wake idle workers and subscribers"""
+        with self._condition:
+            self._condition.notify_all()
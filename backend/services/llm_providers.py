@@ -0,0 +1,504 @@
+"""
+LLM Provider Layer for MediTalks
+Async clients for Gemini and SEA-Lion multiplexed on one shared event loop, with a sync façade for Flask routes
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from collections import namedtuple
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from services.provider_router import ProviderUnavailableError, get_provider_router
+from utils.response_cache import CachedResponse, get_response_cache
+from utils.llm_usage import usage_tracker, response_token_counts
+from utils.token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# httpx transport errors retried like requests.ConnectionError: failed connects and dropped
+# connections, but not read timeouts, since the model may still be generating
+RETRY_TRANSPORT_ERRORS = (httpx.NetworkError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+# Cancellation message marking the losing side of a hedged request
+HEDGE_CANCEL_MESSAGE = 'hedge lost'
+
+# Outcome of one provider call; raw is the provider's own response object
+LLMResult = namedtuple('LLMResult', ['text', 'provider', 'model', 'raw'])
+
+class GeminiProvider:
+    """Gemini calls through generate_content_async on the caller's GenerativeModel"""
+    
+    name = 'gemini'
+    
+    async def generate(self, prompt: str, model=None, **kwargs) -> LLMResult:
+        """
+        Args:
+            prompt (str): Prompt text
+            model: google.generativeai GenerativeModel to call
+            **kwargs: Extra generate_content arguments (e.g. generation_config)
+        """
+        if model is None:
+            raise RuntimeError('Gemini AI not available')
+        
+        response = await model.generate_content_async(prompt, **kwargs)
+        
+        try:
+            text = response.text if response else None
+        except Exception:
+            # Blocked or multi-part responses have no .text; callers inspect raw as before
+            text = None
+        
+        return LLMResult(text, self.name, getattr(model, 'model_name', ''), response)
+    
+    async def aclose(self):
+        pass
+
+class SEALionProvider:
+    """SEA-Lion chat completions over a pooled httpx.AsyncClient, using the service's retry policy"""
+    
+    name = 'sealion'
+    
+    def __init__(self, service):
+        """
+        Args:
+            service: SEALionService supplying the endpoint, payloads, timeouts and retry policy
+        """
+        self.service = service
+        self._client = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the client on first use so it binds to the provider loop"""
+        if self._client is None:
+            connect_timeout, read_timeout = self.service.timeout
+            self._client = httpx.AsyncClient(
+                headers=self.service._build_headers(),
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.service.pool_size,
+                    max_keepalive_connections=self.service.pool_size
+                )
+            )
+        return self._client
+    
+    async def generate(self, prompt: str, language: str = 'en', max_tokens: int = 500) -> LLMResult:
+        """
+        Raises:
+            RuntimeError: On a non-200 response once retries are exhausted
+            httpx.HTTPError: On a read timeout or if every attempt failed with a transport error
+        """
+        service = self.service
+        payload = service._build_payload(prompt, language, max_tokens)
+        client = self._get_client()
+        service._count('requests')
+        
+        for attempt in range(service.max_retries + 1):
+            response = error = None
+            try:
+                response = await client.post(f"{service.api_url}/chat/completions", json=payload)
+            except RETRY_TRANSPORT_ERRORS as e:
+                error = e
+            
+            delay = service._next_retry(attempt, response, error)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        
+        if response.status_code != 200:
+            raise RuntimeError(f"SEA-Lion API error: {response.status_code} - {response.text}")
+        
+        result = response.json()
+        text = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+        return LLMResult(text, self.name, payload.get('model', ''), result)
+    
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class LLMProviderLayer:
+    """
+    Runs provider calls as coroutines on one background event loop
+    
+    A Flask thread waiting on generate() holds no socket of its own: every
+    call is multiplexed on the loop thread, bounded per provider by an
+    asyncio semaphore, and shares that provider's connection pool. submit() lets
+    one thread keep many calls in flight at once.
+    """
+    
+    def __init__(self, max_in_flight: Optional[Dict[str, int]] = None, default_timeout: Optional[float] = None,
+                 router=None):
+        """
+        Args:
+            max_in_flight (dict): Concurrent call limit per provider name
+            default_timeout (float): Seconds the sync façade waits for a call
+            router: Optional ProviderRouter; calls to providers with an open circuit fail immediately
+        """
+        self.max_in_flight = max_in_flight or {}
+        self.default_timeout = default_timeout
+        self.router = router
+        
+        self._providers = {}
+        self._semaphores = {}
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._hedge_stats = {
+            'requests': 0,
+            'hedged': 0,
+            'hedge_wins': 0,
+            'failovers': 0,
+            'skipped_at_limit': 0
+        }
+    
+    def register(self, provider):
+        """Add or replace a provider; its name is used to address calls"""
+        with self._lock:
+            self._providers[provider.name] = provider
+            self._stats.setdefault(provider.name, {
+                'calls': 0,
+                'errors': 0,
+                'rejected': 0,
+                'in_flight': 0,
+                'peak_in_flight': 0,
+                'total_seconds': 0.0
+            })
+    
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the shared event loop thread on first use"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='llm-providers', daemon=True)
+                self._thread.start()
+            return self._loop
+    
+    async def generate_async(self, provider_name: str, prompt: str, **options) -> LLMResult:
+        """
+        Call a provider from code already running on the provider loop
+        
+        Args:
+            provider_name (str): Registered provider name ('gemini', 'sealion')
+            prompt (str): Prompt text
+            **options: Provider-specific options (model, language, max_tokens, ...)
+        
+        Returns:
+            LLMResult: Response text and provider details
+        
+        Raises:
+            ProviderUnavailableError: If the provider's circuit is open
+        """
+        provider = self._providers.get(provider_name)
+        if provider is None:
+            raise RuntimeError(f"Unknown LLM provider: {provider_name}")
+        
+        stats = self._stats[provider_name]
+        router = self.router
+        
+        # A provider with an open circuit costs nothing instead of a full timeout
+        if router is not None and not router.allow(provider_name):
+            stats['rejected'] += 1
+            raise ProviderUnavailableError(f"{provider_name} circuit is open")
+        
+        # Created lazily so the semaphore belongs to the provider loop
+        semaphore = self._semaphores.get(provider_name)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_in_flight.get(provider_name, 64))
+            self._semaphores[provider_name] = semaphore
+        
+        model_name = getattr(options.get('model'), 'model_name', '')
+        started = None
+        failed = True
+        lost_hedge = False
+        try:
+            async with semaphore:
+                stats['calls'] += 1
+                stats['in_flight'] += 1
+                stats['peak_in_flight'] = max(stats['peak_in_flight'], stats['in_flight'])
+                started = time.perf_counter()
+            
+                try:
+                    result = await provider.generate(prompt, **options)
+                except Exception:
+                    stats['errors'] += 1
+                    usage_tracker.record(provider_name, model_name, estimate_tokens(prompt), 0,
+                                         time.perf_counter() - started, failed=True)
+                    raise
+                finally:
+                    stats['in_flight'] -= 1
+                    stats['total_seconds'] += time.perf_counter() - started
+                
+                prompt_tokens, response_tokens = response_token_counts(prompt, result.text, result.raw)
+                usage_tracker.record(provider_name, result.model, prompt_tokens, response_tokens,
+                                     time.perf_counter() - started)
+            
+            failed = False
+            return result
+        
+        except asyncio.CancelledError as e:
+            lost_hedge = e.args == (HEDGE_CANCEL_MESSAGE,)
+            # A call cancelled after it was sent still cost its prompt; a lost hedge is not a failure
+            if started is not None:
+                usage_tracker.record(provider_name, model_name, estimate_tokens(prompt), 0,
+                                     time.perf_counter() - started, failed=not lost_hedge)
+            raise
+        
+        finally:
+            # Timeouts cancel the coroutine and count as failures; queued calls and hedge losers do not
+            if router is not None:
+                if started is None or lost_hedge:
+                    router.release(provider_name)
+                else:
+                    router.record(provider_name, failed, time.perf_counter() - started)
+    
+    def hedge_delay(self, provider_name: str, percentile: float, default_seconds: float,
+                    min_seconds: float = 0.0) -> float:
+        """
+        Seconds to wait for a provider before hedging: a percentile of its recent successful latency
+        
+        Args:
+            provider_name (str): Primary provider
+            percentile (float): Latency percentile (0-100) of the provider's rolling window
+            default_seconds (float): Delay used before the window has successful calls
+            min_seconds (float): Lower bound, so fast windows do not hedge every request
+        """
+        latency = self.router.breaker(provider_name).latency_percentile(percentile) if self.router else None
+        return max(min_seconds, latency if latency is not None else default_seconds)
+    
+    async def generate_hedged_async(self, primary: Tuple[str, str, Dict[str, Any]],
+                                    secondary: Tuple[str, str, Dict[str, Any]], hedge_after: float,
+                                    secondary_limiter=None) -> Tuple[LLMResult, bool]:
+        """
+        Call the primary provider and fire the secondary if it is slow, keeping whichever succeeds first
+        
+        The loser is cancelled, which aborts its request. If the primary fails
+        before hedge_after the secondary is started immediately (a failover).
+        
+        Args:
+            primary: (provider_name, prompt, options) tried first
+            secondary: (provider_name, prompt, options) used as the hedge
+            hedge_after (float): Seconds to wait for the primary before hedging
+            secondary_limiter: Semaphore capping the secondary's concurrent calls; taken
+                without blocking when the hedge fires and released when the secondary finishes.
+                If it is exhausted the hedge is skipped and the primary is awaited alone
+        
+        Returns:
+            tuple: (LLMResult of the winner, whether the secondary was started)
+        
+        Raises:
+            Exception: The primary's error if both calls failed
+        """
+        hedge_stats = self._hedge_stats
+        hedge_stats['requests'] += 1
+        
+        primary_task = asyncio.ensure_future(self.generate_async(primary[0], primary[1], **primary[2]))
+        pending = {primary_task}
+        
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            
+            if done and primary_task.exception() is None:
+                return primary_task.result(), False
+            
+            if secondary_limiter is not None and not secondary_limiter.acquire(blocking=False):
+                # The secondary is already at its concurrency cap; a hedge would overrun it
+                hedge_stats['skipped_at_limit'] += 1
+                return await primary_task, False
+            
+            hedge_stats['failovers' if done else 'hedged'] += 1
+            secondary_task = asyncio.ensure_future(self.generate_async(secondary[0], secondary[1], **secondary[2]))
+            if secondary_limiter is not None:
+                secondary_task.add_done_callback(lambda _: secondary_limiter.release())
+            pending.add(secondary_task)
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary_task and primary_task in pending:
+                            hedge_stats['hedge_wins'] += 1
+                        return task.result(), True
+        finally:
+            for task in pending:
+                task.cancel(HEDGE_CANCEL_MESSAGE)
+        
+        raise primary_task.exception()
+    
+    def generate_hedged(self, primary: Tuple[str, str, Dict[str, Any]], secondary: Tuple[str, str, Dict[str, Any]],
+                        hedge_after: float, timeout: Optional[float] = None,
+                        secondary_limiter=None) -> Tuple[LLMResult, bool]:
+        """Blocking form of generate_hedged_async for synchronous code"""
+        future = asyncio.run_coroutine_threadsafe(
+            self._attributed(
+                usage_tracker.attribution(),
+                self.generate_hedged_async(primary, secondary, hedge_after, secondary_limiter)
+            ),
+            self._get_loop()
+        )
+        try:
+            return future.result(timeout if timeout is not None else self.default_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+    
+    @staticmethod
+    async def _attributed(attribution: tuple, coroutine):
+        """Run a coroutine charged to the request that scheduled it (tasks have their own context)"""
+        usage_tracker.restore(attribution)
+        return await coroutine
+    
+    def submit(self, provider_name: str, prompt: str, **options) -> concurrent.futures.Future:
+        """Schedule a call on the provider loop and return a thread-safe future"""
+        return asyncio.run_coroutine_threadsafe(
+            self._attributed(usage_tracker.attribution(), self.generate_async(provider_name, prompt, **options)),
+            self._get_loop()
+        )
+    
+    def generate(self, provider_name: str, prompt: str, timeout: Optional[float] = None, **options) -> LLMResult:
+        """
+        Blocking call for synchronous code such as Flask routes
+        
+        Args:
+            provider_name (str): Registered provider name
+            prompt (str): Prompt text
+            timeout (float): Seconds to wait before cancelling the call
+            **options: Provider-specific options
+        
+        Returns:
+            LLMResult: Response text and provider details
+        
+        Raises:
+            concurrent.futures.TimeoutError: If the call did not finish in time
+        """
+        future = self.submit(provider_name, prompt, **options)
+        try:
+            return future.result(timeout if timeout is not None else self.default_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get call counters, in-flight counts and mean latency per provider"""
+        with self._lock:
+            stats = {name: dict(provider_stats) for name, provider_stats in self._stats.items()}
+        
+        for name, provider_stats in stats.items():
+            calls, total_seconds = provider_stats['calls'], provider_stats.pop('total_seconds')
+            provider_stats['mean_seconds'] = round(total_seconds / calls, 4) if calls else 0.0
+            provider_stats['max_in_flight'] = self.max_in_flight.get(name, 64)
+        return stats
+    
+    def get_hedge_stats(self) -> Dict[str, Any]:
+        """Get hedged request counters with hedge rate and the share of hedges the secondary won"""
+        stats = dict(self._hedge_stats)
+        stats['hedge_rate'] = round(stats['hedged'] / stats['requests'], 4) if stats['requests'] else 0.0
+        stats['hedge_win_rate'] = round(stats['hedge_wins'] / stats['hedged'], 4) if stats['hedged'] else 0.0
+        return stats
+    
+    def close(self):
+        """Close provider clients and stop the loop thread"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        
+        if loop is None:
+            return
+        
+        async def close_providers():
+            for provider in list(self._providers.values()):
+                await provider.aclose()
+        
+        asyncio.run_coroutine_threadsafe(close_providers(), loop).result(timeout=10)
+        loop.call_soon_threadsafe(loop.stop)
+        self._semaphores.clear()
+
+_llm_providers = None
+_llm_providers_lock = threading.Lock()
+
+def get_llm_providers() -> LLMProviderLayer:
+    """Process-wide provider layer, created on first use so .env settings are loaded"""
+    global _llm_providers
+    
+    with _llm_providers_lock:
+        if _llm_providers is None:
+            _llm_providers = LLMProviderLayer(
+                max_in_flight={
+                    'gemini': int(os.getenv('GEMINI_MAX_IN_FLIGHT', '64')),
+                    'sealion': int(os.getenv('SEALION_MAX_IN_FLIGHT', '64'))
+                },
+                default_timeout=float(os.getenv('LLM_CALL_TIMEOUT_SECONDS', '120')),
+                router=get_provider_router()
+            )
+            _llm_providers.register(GeminiProvider())
+        return _llm_providers
+
+def _response_cache_key(model, prompt: str, kwargs: Dict[str, Any]) -> Optional[str]:
+    """Response cache key for a Gemini call, or None if the cache is disabled"""
+    cache = get_response_cache()
+    if not cache.enabled:
+        return None
+    
+    generation_config = (getattr(model, '_generation_config', None), sorted(kwargs.items()))
+    return cache.make_key(getattr(model, 'model_name', ''), generation_config, prompt)
+
+def cached_response_text(model, prompt: str, **kwargs) -> Optional[str]:
+    """
+    Text cached for a Gemini call made through generate_content, recording the hit
+    
+    Returns:
+        str: Cached response text, or None on a miss
+    """
+    key = _response_cache_key(model, prompt, kwargs)
+    cached_text = get_response_cache().get(key) if key is not None else None
+    
+    if cached_text is not None:
+        usage_tracker.record('gemini', getattr(model, 'model_name', ''), estimate_tokens(prompt),
+                             estimate_tokens(cached_text), 0.0, cache_status='response_cache')
+    return cached_text
+
+def store_response_text(model, prompt: str, text: Optional[str], **kwargs):
+    """Cache the text of a Gemini call made outside generate_content (e.g. a hedged call)"""
+    key = _response_cache_key(model, prompt, kwargs)
+    if key is not None and text:
+        get_response_cache().set(key, text)
+
+def generate_content(model, prompt: str, **kwargs):
+    """
+    Drop-in replacement for model.generate_content(prompt) backed by the shared cache and provider loop
+    
+    Streaming calls bypass both and run on the caller's thread. Empty or
+    blocked responses are not stored.
+    
+    Args:
+        model: google.generativeai GenerativeModel
+        prompt (str): Prompt text
+        **kwargs: Extra generate_content arguments (e.g. generation_config), plus
+            timeout: seconds before the call is cancelled (defaults to the layer's)
+    
+    Returns:
+        The Gemini response, or a CachedResponse exposing the same .text
+    
+    Raises:
+        concurrent.futures.TimeoutError: If the call did not finish within timeout
+    """
+    timeout = kwargs.pop('timeout', None)
+    
+    if kwargs.get('stream'):
+        return model.generate_content(prompt, **kwargs)
+    
+    cached_text = cached_response_text(model, prompt, **kwargs)
+    if cached_text is not None:
+        return CachedResponse(cached_text)
+    
+    result = get_llm_providers().generate('gemini', prompt, model=model, timeout=timeout, **kwargs)
+    store_response_text(model, prompt, result.text, **kwargs)
+    
+    return result.raw
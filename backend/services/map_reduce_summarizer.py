@@ -0,0 +1,189 @@
+"""
+Map-Reduce Summarizer for MediTalks
+Condenses long documents into token-budgeted notes so LLM prompts cover every page
+"""
+
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional
+from utils.token_estimator import estimate_tokens, truncate_to_tokens
+from utils.llm_usage import usage_tracker
+
+logger = logging.getLogger(__name__)
+
+# Sentence boundaries, including Thai and Khmer sentence and paragraph signs
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?\u0e2f\u0e5a\u0e5b\u17d4\u17d5])\s+')
+
+# Reduce passes stop after this many rounds and truncate instead
+MAX_REDUCE_ROUNDS = 3
+
+class MapReduceSummarizer:
+    """Splits documents into chunks, condenses chunks concurrently, then merges the notes"""
+    
+    def __init__(self, generate: Callable[[str], Optional[str]], document_tokens: Optional[int] = None,
+                 chunk_tokens: Optional[int] = None, max_workers: Optional[int] = None, max_cache_entries: int = 32):
+        """
+        Args:
+            generate: Callable that sends a prompt to the LLM and returns its text, or None on failure
+            document_tokens (int): Budget for the text handed to the final prompt
+            chunk_tokens (int): Budget for each map chunk
+            max_workers (int): Maximum concurrent map calls per document
+            max_cache_entries (int): Condensed documents remembered by content hash
+        """
+        self.generate = generate
+        self.document_tokens = document_tokens or int(os.getenv('LLM_DOCUMENT_TOKEN_BUDGET', '2000'))
+        self.chunk_tokens = chunk_tokens or int(os.getenv('LLM_CHUNK_TOKENS', '3000'))
+        self.max_workers = max_workers or int(os.getenv('LLM_MAP_CONCURRENCY', '4'))
+        self.max_cache_entries = max_cache_entries
+        
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def condense(self, text: str) -> str:
+        """
+        Return text that fits the document budget, condensing it with map-reduce if needed
+        
+        Short documents are returned unchanged. Long documents are split into
+        chunks, each chunk is condensed into notes concurrently (map), and the
+        notes are merged until they fit the budget (reduce). The caller's own
+        prompt acts as the final reduce pass over the notes.
+        
+        Args:
+            text (str): Full document text
+        
+        Returns:
+            str: Text or notes within the document token budget
+        """
+        if estimate_tokens(text) <= self.document_tokens:
+            return text
+        
+        key = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        
+        condensed = self._condense_chunks(self.iter_chunks([text]))
+        
+        with self._lock:
+            self._cache[key] = condensed
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+        
+        return condensed
+    
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[str]:
+        """
+        Group text into chunks of at most chunk_tokens, splitting on sentence boundaries
+        
+        Args:
+            pages: Iterable of text blocks
+        
+        Yields:
+            str: Chunk text
+        """
+        current = []
+        current_tokens = 0
+        
+        for page in pages:
+            for sentence in _SENTENCE_BOUNDARY.split(page):
+                sentence_tokens = estimate_tokens(sentence)
+                
+                if current and current_tokens + sentence_tokens > self.chunk_tokens:
+                    yield ' '.join(current)
+                    current = []
+                    current_tokens = 0
+                
+                # A single oversized sentence (e.g. a table without punctuation) is hard-split
+                while sentence_tokens > self.chunk_tokens:
+                    head = truncate_to_tokens(sentence, self.chunk_tokens)
+                    yield head
+                    sentence = sentence[len(head):].lstrip()
+                    sentence_tokens = estimate_tokens(sentence)
+                
+                if sentence:
+                    current.append(sentence)
+                    current_tokens += sentence_tokens
+        
+        if current:
+            yield ' '.join(current)
+    
+    def _condense_chunks(self, chunks: Iterable[str]) -> str:
+        """Map every chunk to notes, then reduce until the notes fit the budget"""
+        notes = self._map(chunks, self._build_map_prompt)
+        combined = '\n\n'.join(notes)
+        
+        rounds = 0
+        while estimate_tokens(combined) > self.document_tokens and len(notes) > 1 and rounds < MAX_REDUCE_ROUNDS:
+            rounds += 1
+            groups = self._group_notes(notes)
+            notes = self._map(groups, self._build_reduce_prompt)
+            combined = '\n\n'.join(notes)
+        
+        logger.info(f"Condensed document to {estimate_tokens(combined)} tokens after {rounds} reduce rounds")
+        return truncate_to_tokens(combined, self.document_tokens)
+    
+    def _map(self, chunks: Iterable[str], build_prompt: Callable[[str], str]) -> List[str]:
+        """Run build_prompt(chunk) through the LLM for every chunk with bounded parallelism, preserving order"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [(chunk, executor.submit(usage_tracker.wrap(self._generate_notes), build_prompt(chunk))) for chunk in chunks]
+            
+            # Chunks the model could not condense keep their leading text rather than being dropped
+            share = max(1, self.document_tokens // max(1, len(futures)))
+            return [future.result() or truncate_to_tokens(chunk, share) for chunk, future in futures]
+    
+    def _generate_notes(self, prompt: str) -> Optional[str]:
+        """Call the LLM, treating errors as a missing result"""
+        try:
+            result = self.generate(prompt)
+            return result.strip() if result else None
+        except Exception as e:
+            logger.warning(f"Map-reduce LLM call failed: {str(e)}")
+            return None
+    
+    def _group_notes(self, notes: List[str]) -> List[str]:
+        """Group consecutive notes so each group fits a chunk"""
+        groups = []
+        current = []
+        current_tokens = 0
+        
+        for note in notes:
+            note_tokens = estimate_tokens(note)
+            if current and current_tokens + note_tokens > self.chunk_tokens:
+                groups.append('\n\n'.join(current))
+                current = []
+                current_tokens = 0
+            current.append(note)
+            current_tokens += note_tokens
+        
+        if current:
+            groups.append('\n\n'.join(current))
+        
+        return groups
+    
+    def _build_map_prompt(self, chunk: str) -> str:
+        """Prompt that condenses one chunk of a medical document into notes"""
+        return f"""
+You are reading one part of a longer medical document.
+Write concise notes covering every medication, dosage, diagnosis, test result, instruction, warning and follow-up date in this part.
+Keep the notes in the same language as the text. Do not add information that is not in the text.
+
+Document part:
+{chunk}
+"""
+    
+    def _build_reduce_prompt(self, notes: str) -> str:
+        """Prompt that merges notes from consecutive document parts"""
+        return f"""
+Merge the following notes from consecutive parts of one medical document into a single set of concise notes.
+Remove repetition but keep every medication, dosage, diagnosis, instruction, warning and follow-up date.
+Keep the notes in the same language as the input.
+
+Notes:
+{notes}
+"""
@@ -0,0 +1,137 @@
+"""
+Gemini Model Registry for MediTalks
+One process-wide Gemini configuration handing out model handles by role
+"""
+
+import os
+import json
+import logging
+import threading
+import google.generativeai as genai
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Roles services request models for
+ROLE_ADAPTATION = 'adaptation'
+ROLE_DOCUMENT_ANALYSIS = 'document_analysis'
+ROLE_SUMMARIZATION = 'summarization'
+
+DEFAULT_MODEL_NAME = 'gemini-1.5-flash'
+
+class ModelRegistry:
+    """
+    Shared Gemini setup for every service
+    
+    genai.configure runs once, and the google-generativeai client (and its
+    connection) is shared by every model it creates. Handles are cached per
+    (model name, generation config), so roles with the same settings share
+    one GenerativeModel. Each role can have its own model and generation
+    config without another configure call or client.
+    """
+    
+    def __init__(self, api_key: Optional[str], role_settings: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Args:
+            api_key (str): Gemini API key; without it every lookup returns None
+            role_settings (dict): role -> {'model': name, 'generation_config': dict or None}
+        """
+        self.api_key = api_key
+        self.role_settings = role_settings or {}
+        
+        self._models = {}
+        self._configured = False
+        self._lock = threading.Lock()
+    
+    def _configure(self) -> bool:
+        """Configure the Gemini client once (lock held)"""
+        if not self._configured and self.api_key:
+            genai.configure(api_key=self.api_key)
+            self._configured = True
+            logger.info("Gemini client configured")
+        return self._configured
+    
+    def model_name(self, role: str) -> str:
+        """Model name currently assigned to a role"""
+        return self.role_settings.get(role, {}).get('model') or DEFAULT_MODEL_NAME
+    
+    def get_model(self, role: str, model_name: Optional[str] = None):
+        """
+        Get the shared model handle for a role
+        
+        Args:
+            role (str): ROLE_ADAPTATION, ROLE_DOCUMENT_ANALYSIS or ROLE_SUMMARIZATION
+            model_name (str): Use this model instead of the role's assigned one
+        
+        Returns:
+            GenerativeModel with the role's generation config, or None if Gemini is not configured
+        """
+        model_name = model_name or self.model_name(role)
+        generation_config = self.role_settings.get(role, {}).get('generation_config')
+        key = (model_name, json.dumps(generation_config, sort_keys=True))
+        
+        with self._lock:
+            if not self._configure():
+                return None
+            
+            model = self._models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(model_name, generation_config=generation_config)
+                self._models[key] = model
+            return model
+    
+    def assign(self, role: str, model_name: str):
+        """Point a role at another model, e.g. after warm-up finds the preferred one unavailable"""
+        with self._lock:
+            self.role_settings.setdefault(role, {})['model'] = model_name
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the model and generation config per role and the number of distinct handles"""
+        with self._lock:
+            return {
+                'configured': self._configured,
+                'handles': len(self._models),
+                'roles': {
+                    role: {
+                        'model': settings.get('model') or DEFAULT_MODEL_NAME,
+                        'generation_config': settings.get('generation_config')
+                    }
+                    for role, settings in self.role_settings.items()
+                }
+            }
+
+def _role_settings_from_env(role: str) -> Dict[str, Any]:
+    """Model and generation config for a role from GEMINI_<ROLE>_MODEL / _TEMPERATURE / _MAX_OUTPUT_TOKENS"""
+    prefix = f"GEMINI_{role.upper()}"
+    generation_config = {}
+    
+    temperature = os.getenv(f"{prefix}_TEMPERATURE")
+    if temperature:
+        generation_config['temperature'] = float(temperature)
+    
+    max_output_tokens = os.getenv(f"{prefix}_MAX_OUTPUT_TOKENS")
+    if max_output_tokens:
+        generation_config['max_output_tokens'] = int(max_output_tokens)
+    
+    return {
+        'model': os.getenv(f"{prefix}_MODEL") or os.getenv('GEMINI_MODEL', DEFAULT_MODEL_NAME),
+        'generation_config': generation_config or None
+    }
+
+_model_registry = None
+_model_registry_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """Process-wide model registry, created on first use so .env settings are loaded"""
+    global _model_registry
+    
+    with _model_registry_lock:
+        if _model_registry is None:
+            _model_registry = ModelRegistry(
+                api_key=os.getenv('GEMINI_API_KEY'),
+                role_settings={
+                    role: _role_settings_from_env(role)
+                    for role in (ROLE_ADAPTATION, ROLE_DOCUMENT_ANALYSIS, ROLE_SUMMARIZATION)
+                }
+            )
+        return _model_registry
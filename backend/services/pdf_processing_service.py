@@ -5,28 +5,130 @@ Handles PDF text extraction and processing using Google Gemini AI
 
 import os
 import logging
+import tempfile
+import threading
+import multiprocessing
 import PyPDF2
 import pdfplumber
-import google.generativeai as genai
-from typing import Dict, Any, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional
 from io import BytesIO
-from langdetect import detect, DetectorFactory
 from dotenv import load_dotenv
+from utils.extraction_cache import ExtractionCache, compute_content_key
+from utils.text_normalizer import normalize_text
+from utils.language_detector import LanguageDetector
+from utils.boilerplate_filter import BoilerplateFilter
+from config.medical_terms import MEDICAL_TERMS_BY_LANGUAGE
+from services.llm_providers import generate_content
+from services.model_registry import ROLE_DOCUMENT_ANALYSIS, get_model_registry
+from utils.llm_usage import usage_tracker
+from services.map_reduce_summarizer import MapReduceSummarizer
 
 # Load environment variables
 load_dotenv()
 
-# Set seed for consistent language detection
-DetectorFactory.seed = 0
-
 logger = logging.getLogger(__name__)
 
+# Minimum amount of text for an extraction to count as successful
+MIN_EXTRACTED_CHARS = 10
+
+# Number of leading characters used for language detection
+LANGUAGE_SAMPLE_CHARS = 1000
+
+# Header prepended to every formatted analysis
+ANALYSIS_HEADER = "📄 **MEDICAL DOCUMENT ANALYSIS**\n\n"
+
+# Bump whenever extraction or cleaning output changes so cached results are not reused
+EXTRACTION_PIPELINE_VERSION = 9
+
+# Persistent process pool shared by all service instances in this worker
+_extraction_pool = None
+_extraction_pool_workers = 0
+_extraction_pool_lock = threading.Lock()
+
+def _extract_pdfplumber_page(page, page_num: int) -> Optional[Dict[str, Any]]:
+    """Extract a single pdfplumber page, releasing its layout cache afterwards"""
+    try:
+        page_text = page.extract_text()
+        if page_text:
+            return {'page_number': page_num + 1, 'text': page_text, 'engine': 'pdfplumber'}
+        return None
+    
+    except Exception as e:
+        logger.warning(f"Error extracting page {page_num + 1}: {str(e)}")
+        return None
+    
+    finally:
+        # Drop parsed layout objects so memory stays flat on long documents
+        page.flush_cache()
+
+def _extract_page_range(source, page_numbers: List[int]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Extract the given pages with pdfplumber inside a pool worker
+    
+    Args:
+        source: PDF bytes or a path to the PDF on disk
+        page_numbers (List[int]): 0-based page indices to extract
+    
+    Returns:
+        List of extracted page dicts (None for pages without text), aligned with page_numbers
+    """
+    stream = BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    
+    with pdfplumber.open(stream) as pdf:
+        return [_extract_pdfplumber_page(pdf.pages[page_num], page_num) for page_num in page_numbers]
+
+def _get_extraction_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared extraction pool, creating it on first use"""
+    global _extraction_pool, _extraction_pool_workers
+    
+    with _extraction_pool_lock:
+        if _extraction_pool is None or _extraction_pool_workers != workers:
+            if _extraction_pool is not None:
+                _extraction_pool.shutdown(wait=False)
+            
+            # spawn avoids inheriting locks held by other request threads at fork time
+            _extraction_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _extraction_pool_workers = workers
+            logger.info(f"Started PDF extraction pool with {workers} workers")
+        
+        return _extraction_pool
+
 class PDFProcessingService:
     """Service for processing PDF documents and extracting text"""
     
     def __init__(self):
         self.api_key = os.getenv('GEMINI_API_KEY')
         self.model = None
+        
+        # Parallel extraction settings (0 workers means one per spare CPU core)
+        self.parallel_workers = int(os.getenv('PDF_PARALLEL_WORKERS', '0')) or max(1, (os.cpu_count() or 1) - 1)
+        self.parallel_min_pages = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '20'))
+        self.parallel_chunk_pages = int(os.getenv('PDF_PARALLEL_CHUNK_PAGES', '8'))
+        
+        # Extraction results keyed by SHA-256 of the uploaded bytes
+        self.extraction_cache = ExtractionCache(
+            max_entries=int(os.getenv('PDF_CACHE_MAX_ENTRIES', '128')),
+            cache_dir=os.getenv('PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'meditalks-extraction-cache')),
+            max_disk_entries=int(os.getenv('PDF_CACHE_DISK_ENTRIES', '1000')),
+            version=EXTRACTION_PIPELINE_VERSION
+        )
+        
+        # Script-based detection, memoized by sample hash
+        self.language_detector = LanguageDetector(sample_chars=LANGUAGE_SAMPLE_CHARS)
+        
+        # Repeated headers and footers are learned from the first pages (0 disables filtering)
+        self.boilerplate_learn_pages = int(os.getenv('PDF_BOILERPLATE_LEARN_PAGES', '4'))
+        self._boilerplate_stats = {'documents': 0, 'lines_removed': 0, 'chars_saved': 0, 'tokens_saved': 0}
+        self._boilerplate_lock = threading.Lock()
+        
+        # Long documents are condensed chunk by chunk instead of truncated
+        self.summarizer = MapReduceSummarizer(self._generate_text)
+        
         self._initialize_gemini()
     
     def _initialize_gemini(self):
@@ -36,15 +138,22 @@ class PDFProcessingService:
                 logger.error("GEMINI_API_KEY not found in environment variables")
                 return False
             
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            self.model = get_model_registry().get_model(ROLE_DOCUMENT_ANALYSIS)
             logger.info("Gemini AI initialized for PDF processing")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Failed to initialize Gemini AI: {str(e)}")
             return False
     
+    def _generate_text(self, prompt: str) -> Optional[str]:
+        """Send a prompt to Gemini and return the response text"""
+        if not self.model:
+            return None
+        
+        response = generate_content(self.model, prompt)
+        return response.text if response else None
+    
     def extract_text_from_pdf(self, file, target_language: str = 'en') -> Dict[str, Any]:
         """
         Extract text from PDF file
@@ -52,112 +161,372 @@ class PDFProcessingService:
         Args:
             file: PDF file object
             target_language (str): Target language code
-            
+        
         Returns:
             Dict containing extraction result
         """
         try:
-            # Reset file pointer
-            file.seek(0)
+            result = None
+            for event in self.stream_extraction(file):
+                if event['event'] == 'extracted':
+                    result = event['result']
+            
+            return result
+        
+        except Exception as e:
+            logger.error(f"Error extracting text from PDF: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'text': ''
+            }
+    
+    def stream_extraction(self, file) -> Iterator[Dict[str, Any]]:
+        """
+        Extract text from PDF file while reporting progress
+        
+        Args:
+            file: PDF file object
+        
+        Yields:
+            Progress events, in order:
+            - {'event': 'pages', 'page_count'} once the document structure is known
+            - {'event': 'page', 'page_number', 'page_count', 'chars', 'engine'} per extracted page
+            - {'event': 'language', 'detected_language'} as soon as enough text has been seen
+            - {'event': 'extracted', 'result'} with the same dict extract_text_from_pdf returns
+        """
+        # Identical uploads skip parsing entirely
+        cache_key = compute_content_key(file)
+        cached_result = self.extraction_cache.get(cache_key)
+        
+        if cached_result is not None:
+            logger.info(f"Extraction cache hit for {cache_key[:12]}")
+            cached_result['cache_hit'] = True
+            yield {'event': 'pages', 'page_count': cached_result.get('page_count')}
+            yield {'event': 'language', 'detected_language': cached_result.get('detected_language')}
+            yield {'event': 'extracted', 'result': cached_result}
+            return
+        
+        probe = self._probe_document(file)
+        page_count = len(probe[1]) if probe else None
+        yield {'event': 'pages', 'page_count': page_count}
+        
+        cleaned_pages = []
+        language_sample = ''
+        detected_language = None
+        extracted_pages = 0
+        
+        boilerplate_filter = self._create_boilerplate_filter()
+        pages = self._iter_probed_pages(file, probe)
+        if boilerplate_filter:
+            pages = boilerplate_filter.filter_pages(pages)
+        
+        # Consume pages as they are extracted so only cleaned text is retained
+        for page in pages:
+            extracted_pages += 1
             
-            # Try pdfplumber first (better for complex layouts)
-            extracted_text = self._extract_with_pdfplumber(file)
+            if len(language_sample) < LANGUAGE_SAMPLE_CHARS:
+                language_sample += page['text'][:LANGUAGE_SAMPLE_CHARS - len(language_sample)] + '\n'
             
-            if not extracted_text or len(extracted_text.strip()) < 10:
-                # Fallback to PyPDF2
-                file.seek(0)
-                extracted_text = self._extract_with_pypdf2(file)
+            cleaned_page = self._clean_text(page['text'])
+            if cleaned_page:
+                cleaned_pages.append(cleaned_page)
+            
+            yield {
+                'event': 'page',
+                'page_number': page['page_number'],
+                'page_count': page_count,
+                'chars': len(cleaned_page),
+                'engine': page['engine']
+            }
             
-            if not extracted_text or len(extracted_text.strip()) < 10:
-                return {
+            if detected_language is None and len(language_sample) >= LANGUAGE_SAMPLE_CHARS:
+                detected_language = self._detect_language(language_sample)
+                yield {'event': 'language', 'detected_language': detected_language}
+        
+        cleaned_text = ' '.join(cleaned_pages)
+        
+        if len(cleaned_text) < MIN_EXTRACTED_CHARS:
+            yield {
+                'event': 'extracted',
+                'result': {
                     'success': False,
                     'error': 'Could not extract text from PDF',
                     'text': ''
                 }
+            }
+            return
+        
+        if detected_language is None:
+            detected_language = self._detect_language(language_sample)
+            yield {'event': 'language', 'detected_language': detected_language}
+        
+        result = {
+            'success': True,
+            'text': cleaned_text,
+            'detected_language': detected_language,
+            'word_count': len(cleaned_text.split()),
+            'char_count': len(cleaned_text),
+            'page_count': page_count or extracted_pages
+        }
+        
+        if boilerplate_filter:
+            result['boilerplate'] = self._record_boilerplate_stats(boilerplate_filter)
+        
+        self.extraction_cache.set(cache_key, result)
+        
+        yield {'event': 'extracted', 'result': {**result, 'cache_hit': False}}
+    
+    def _create_boilerplate_filter(self) -> Optional[BoilerplateFilter]:
+        """Create a per-document boilerplate filter, or None if filtering is disabled"""
+        if self.boilerplate_learn_pages <= 0:
+            return None
+        return BoilerplateFilter(learn_pages=self.boilerplate_learn_pages)
+    
+    def _record_boilerplate_stats(self, boilerplate_filter: BoilerplateFilter) -> Dict[str, int]:
+        """Log and aggregate what the boilerplate filter saved on one document"""
+        stats = boilerplate_filter.get_stats()
+        
+        if stats['lines_removed']:
+            logger.info(f"Removed {stats['lines_removed']} boilerplate lines, saving {stats['chars_saved']} chars (~{stats['tokens_saved']} tokens)")
+        
+        with self._boilerplate_lock:
+            self._boilerplate_stats['documents'] += 1
+            for field in ('lines_removed', 'chars_saved', 'tokens_saved'):
+                self._boilerplate_stats[field] += stats[field]
+        
+        return stats
+    
+    def get_boilerplate_stats(self) -> Dict[str, int]:
+        """Get boilerplate savings aggregated over all extracted documents"""
+        with self._boilerplate_lock:
+            return dict(self._boilerplate_stats)
+    
+    def _iter_probed_pages(self, file, probe: Optional[tuple]) -> Iterator[Dict[str, Any]]:
+        """
+        Extract pages lazily, following the engine plan from _probe_document
+        
+        Each page is parsed by its planned engine (the other only retries pages
+        it failed on) and pages without a text layer are not parsed at all.
+        
+        Yields:
+            Dict with page_number, raw text and engine
+        """
+        if probe is None:
+            # PyPDF2 could not read the document structure, let pdfplumber try on its own
+            yield from (page for _, page in self._iter_pdfplumber_pages(file, None) if page)
+            return
+        
+        reader, page_engines = probe
+        plumber_pages = [page_num for page_num, engine in enumerate(page_engines) if engine == 'pdfplumber']
+        plumber_results = self._iter_pdfplumber_pages(file, plumber_pages)
+        fallback_source = None
+        
+        for page_num, engine in enumerate(page_engines):
+            if engine == 'pdfplumber':
+                _, extracted_page = next(plumber_results, (page_num, None))
+                if not extracted_page:
+                    # pdfplumber failed or found nothing on this page, retry it with PyPDF2
+                    extracted_page = self._extract_pypdf2_page(reader.pages[page_num], page_num)
+            elif engine == 'pypdf2':
+                extracted_page = self._extract_pypdf2_page(reader.pages[page_num], page_num)
+                if not extracted_page:
+                    # Opened separately, since the pdfplumber pass above may still be reading the file
+                    if fallback_source is None:
+                        fallback_source = self._pdf_source(file)
+                    extracted_page = self._extract_pdfplumber_fallback(fallback_source, page_num)
+            else:
+                continue
             
-            # Detect language
-            detected_language = self._detect_language(extracted_text)
-            
-            # Clean and process text
-            cleaned_text = self._clean_text(extracted_text)
+            if extracted_page:
+                yield extracted_page
+    
+    def _pdf_source(self, file):
+        """Path of a spooled upload, or the PDF bytes, for opening the document independently"""
+        source = getattr(file, 'path', None)
+        if not source:
+            position = file.tell()
+            file.seek(0)
+            source = file.read()
+            file.seek(position)
+        return source
+    
+    def _extract_pdfplumber_fallback(self, source, page_num: int) -> Optional[Dict[str, Any]]:
+        """Extract a single page with pdfplumber after PyPDF2 returned nothing for it"""
+        try:
+            return _extract_page_range(source, [page_num])[0]
+        
+        except Exception as e:
+            logger.warning(f"pdfplumber fallback for page {page_num + 1} failed: {str(e)}")
+            return None
             
-            return {
-                'success': True,
-                'text': cleaned_text,
-                'detected_language': detected_language,
-                'word_count': len(cleaned_text.split()),
-                'char_count': len(cleaned_text)
-            }
+    def _probe_document(self, file) -> Optional[tuple]:
+        """
+        Inspect page fonts and content streams once to choose an extractor per page
+        
+        Only the document structure is read here; content streams are not parsed.
+        
+        Args:
+            file: PDF file object
+        
+        Returns:
+            Tuple of (PyPDF2 reader, per-page engine list), or None if the probe failed.
+            Engines are 'pdfplumber', 'pypdf2' or None for pages without a text layer.
+        """
+        try:
+            file.seek(0)
+            reader = PyPDF2.PdfReader(file)
+            page_engines = [self._choose_page_engine(page) for page in reader.pages]
             
+            logger.info(
+                f"PDF probe: {len(page_engines)} pages, "
+                f"{page_engines.count('pdfplumber')} pdfplumber, "
+                f"{page_engines.count('pypdf2')} PyPDF2, "
+                f"{page_engines.count(None)} without text layer"
+            )
+            return reader, page_engines
+        
         except Exception as e:
-            logger.error(f"Error extracting text from PDF: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e),
-                'text': ''
-            }
+            logger.warning(f"PDF probe failed: {str(e)}")
+            return None
     
-    def _extract_with_pdfplumber(self, file) -> str:
-        """Extract text using pdfplumber"""
+    def _choose_page_engine(self, page) -> Optional[str]:
+        """Pick the extractor for a single page from its resources"""
         try:
-            text_content = []
+            if '/Contents' not in page:
+                return None
             
-            with pdfplumber.open(file) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_content.append(page_text)
-                        
-                        # Limit to first 10 pages for performance
-                        if page_num >= 9:
-                            break
-                            
-                    except Exception as e:
-                        logger.warning(f"Error extracting page {page_num + 1}: {str(e)}")
-                        continue
-            
-            return '\n'.join(text_content)
+            fonts = self._collect_page_fonts(page.get('/Resources'), depth=0)
+            if not fonts:
+                # Image-only (scanned) page: neither engine can recover text
+                return None
             
+            # pdfminer emits (cid:NN) placeholders for fonts it cannot map to Unicode
+            for font in fonts:
+                subtype = font.get('/Subtype')
+                if subtype == '/Type3' or (subtype == '/Type0' and '/ToUnicode' not in font):
+                    return 'pypdf2'
+            
+            return 'pdfplumber'
+        
         except Exception as e:
-            logger.error(f"pdfplumber extraction failed: {str(e)}")
-            return ""
+            logger.warning(f"Could not probe page resources: {str(e)}")
+            return 'pdfplumber'
     
-    def _extract_with_pypdf2(self, file) -> str:
-        """Extract text using PyPDF2 as fallback"""
+    def _collect_page_fonts(self, resources, depth: int) -> list:
+        """Collect font dictionaries from page resources, including form XObjects"""
+        if resources is None or depth > 2:
+            return []
+        
+        resources = resources.get_object()
+        fonts = []
+        
+        if '/Font' in resources:
+            fonts.extend(font.get_object() for font in resources['/Font'].values())
+        
+        if '/XObject' in resources:
+            for xobject in resources['/XObject'].values():
+                xobject = xobject.get_object()
+                if xobject.get('/Subtype') == '/Form':
+                    fonts.extend(self._collect_page_fonts(xobject.get('/Resources'), depth + 1))
+        
+        return fonts
+    
+    def _iter_pdfplumber_pages(self, file, page_numbers: Optional[List[int]]) -> Iterator[tuple]:
+        """
+        Extract the given pages using pdfplumber, in parallel for large documents
+        
+        Args:
+            file: PDF file object
+            page_numbers: 0-based page indices to extract, or None for every page
+        
+        Yields:
+            Tuple of (page index, extracted page dict or None) for every requested page
+        """
+        if page_numbers is not None and not page_numbers:
+            return
+        
         try:
-            text_content = []
-            pdf_reader = PyPDF2.PdfReader(file)
+            file.seek(0)
             
-            # Limit to first 10 pages
-            max_pages = min(len(pdf_reader.pages), 10)
+            with pdfplumber.open(file) as pdf:
+                if page_numbers is None:
+                    page_numbers = list(range(len(pdf.pages)))
+                
+                if self.parallel_workers > 1 and len(page_numbers) >= self.parallel_min_pages:
+                    yield from self._iter_pdfplumber_pages_parallel(file, pdf, page_numbers)
+                    return
+                
+                for page_num in page_numbers:
+                    yield page_num, _extract_pdfplumber_page(pdf.pages[page_num], page_num)
+        
+        except Exception as e:
+            logger.error(f"pdfplumber extraction failed: {str(e)}")
+    
+    def _iter_pdfplumber_pages_parallel(self, file, pdf, page_numbers: List[int]) -> Iterator[tuple]:
+        """
+        Extract page ranges across the process pool and yield them in page order
+        
+        Only a bounded window of ranges is in flight at once, so results never
+        pile up faster than the consumer reads them. A range whose worker fails
+        is extracted serially from the already-open document instead.
+        
+        Args:
+            file: PDF file object
+            pdf: Open pdfplumber document for the same file
+            page_numbers (List[int]): 0-based page indices to extract
+        
+        Yields:
+            Tuple of (page index, extracted page dict or None)
+        """
+        # Spooled uploads are opened by path in the workers instead of pickling their bytes
+        source = self._pdf_source(file)
+        
+        pool = _get_extraction_pool(self.parallel_workers)
+        
+        ranges = deque(
+            page_numbers[start:start + self.parallel_chunk_pages]
+            for start in range(0, len(page_numbers), self.parallel_chunk_pages)
+        )
+        in_flight = deque()
+        
+        logger.info(f"Extracting {len(page_numbers)} pages in {len(ranges)} ranges across {self.parallel_workers} workers")
+        
+        while ranges or in_flight:
+            while ranges and len(in_flight) < self.parallel_workers * 2:
+                page_range = ranges.popleft()
+                in_flight.append((page_range, pool.submit(_extract_page_range, source, page_range)))
             
-            for page_num in range(max_pages):
-                try:
-                    page = pdf_reader.pages[page_num]
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content.append(page_text)
-                        
-                except Exception as e:
-                    logger.warning(f"Error extracting page {page_num + 1}: {str(e)}")
-                    continue
+            page_range, future = in_flight.popleft()
             
-            return '\n'.join(text_content)
+            try:
+                yield from zip(page_range, future.result())
             
+            except Exception as e:
+                logger.warning(f"Parallel extraction of pages {page_range[0] + 1}-{page_range[-1] + 1} failed, retrying serially: {str(e)}")
+                for page_num in page_range:
+                    yield page_num, _extract_pdfplumber_page(pdf.pages[page_num], page_num)
+    
+    def _extract_pypdf2_page(self, page, page_num: int) -> Optional[Dict[str, Any]]:
+        """Extract a single page using PyPDF2"""
+        try:
+            page_text = page.extract_text()
+            if page_text:
+                return {'page_number': page_num + 1, 'text': page_text, 'engine': 'pypdf2'}
+            return None
+        
         except Exception as e:
-            logger.error(f"PyPDF2 extraction failed: {str(e)}")
-            return ""
+            logger.warning(f"Error extracting page {page_num + 1}: {str(e)}")
+            return None
     
     def _detect_language(self, text: str) -> str:
         """Detect the language of extracted text"""
         try:
-            if len(text.strip()) < 10:
+            if len(text.strip()) < MIN_EXTRACTED_CHARS:
                 return "unknown"
             
-            # Use first 1000 characters for detection
-            sample_text = text[:1000]
-            detected = detect(sample_text)
+            # Thai, Khmer and Vietnamese are settled by script; langdetect only sees ambiguous Latin text
+            detected = self.language_detector.detect(text)
             
             # Map common language codes to full names
             language_map = {
@@ -171,29 +540,14 @@ class PDFProcessingService:
             }
             
             return language_map.get(detected, detected)
-            
+        
         except Exception as e:
             logger.warning(f"Language detection failed: {str(e)}")
             return "unknown"
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
-        if not text:
-            return ""
-        
-        # Remove excessive whitespace
-        import re
-        
-        # Replace multiple spaces with single space
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove excessive line breaks
-        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
-        
-        # Clean up common PDF artifacts
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}\"\'\/\\\n]', ' ', text)
-        
-        return text.strip()
+        return normalize_text(text)
     
     def summarize_pdf_content(self, text: str, target_language: str = 'en') -> str:
         """
@@ -202,7 +556,7 @@ class PDFProcessingService:
         Args:
             text (str): Extracted text to summarize
             target_language (str): Target language for summary
-            
+        
         Returns:
             str: Summarized content
         """
@@ -216,16 +570,16 @@ Focus on key medical information, instructions, and important details.
 Keep the summary concise but comprehensive.
 
 Text to summarize:
-{text[:3000]}  # Limit text length for API
+{self.summarizer.condense(text)}
 """
             
-            response = self.model.generate_content(prompt)
+            response = generate_content(self.model, prompt)
             
             if response.text:
                 return response.text.strip()
             else:
                 return self._simple_summary(text)
-                
+        
         except Exception as e:
             logger.error(f"Error summarizing with Gemini: {str(e)}")
             return self._simple_summary(text)
@@ -238,7 +592,7 @@ Text to summarize:
             text (str): Extracted PDF text
             cultural_context (str): Cultural context for adaptation
             target_language (str): Target language for explanation
-            
+        
         Returns:
             str: Detailed explanation
         """
@@ -274,7 +628,7 @@ You are a medical communication expert. Analyze the following medical document a
 The target audience is: {context_description}
 
 Medical Document Text:
-{text[:3000]}
+{self.summarizer.condense(text)}
 
 Provide a complete summary in {language_name} that includes:
 1. What this medical document is about
@@ -286,13 +640,13 @@ Provide a complete summary in {language_name} that includes:
 Write everything in {language_name} only. Make it culturally appropriate and easy to understand.
 """
             
-            response = self.model.generate_content(prompt)
+            response = generate_content(self.model, prompt)
             
             if response.text:
                 return response.text.strip()
             else:
                 return self._fallback_detailed_explanation(text, cultural_context)
-                
+        
         except Exception as e:
             logger.error(f"Error generating detailed explanation: {str(e)}")
             return self._fallback_detailed_explanation(text, cultural_context)
@@ -305,7 +659,7 @@ Write everything in {language_name} only. Make it culturally appropriate and eas
             text (str): Extracted PDF text
             cultural_context (str): Cultural context for adaptation
             target_language (str): Target language for solutions
-            
+        
         Returns:
             list: List of actionable solutions
         """
@@ -338,7 +692,7 @@ Write everything in {language_name} only. Make it culturally appropriate and eas
 Based on this medical document, provide ONLY actionable solutions in {language_name} for: {context_description}
 
 Medical Document:
-{text[:2500]}
+{self.summarizer.condense(text)}
 
 Provide 5-7 specific solutions in {language_name} that are:
 1. Culturally appropriate and respectful
@@ -350,7 +704,7 @@ Provide 5-7 specific solutions in {language_name} that are:
 Write ONLY in {language_name}. Format as a numbered list of clear action items.
 """
             
-            response = self.model.generate_content(prompt)
+            response = generate_content(self.model, prompt)
             
             if response.text:
                 # Parse the solutions into a list
@@ -368,7 +722,7 @@ Write ONLY in {language_name}. Format as a numbered list of clear action items.
                 return solutions[:7]  # Limit to 7 solutions
             else:
                 return self._fallback_solutions(text, cultural_context)
-                
+        
         except Exception as e:
             logger.error(f"Error generating cultural solutions: {str(e)}")
             return self._fallback_solutions(text, cultural_context)
@@ -380,7 +734,7 @@ Write ONLY in {language_name}. Format as a numbered list of clear action items.
         Args:
             text (str): Extracted PDF text
             target_language (str): Target language for concepts
-            
+        
         Returns:
             Dict: Dictionary containing key_terms, medical_concepts, and instructions
         """
@@ -403,7 +757,7 @@ Write ONLY in {language_name}. Format as a numbered list of clear action items.
 Analyze this medical document and extract key information in {language_name} ONLY. Do not use English.
 
 Medical Document:
-{text[:2500]}
+{self.summarizer.condense(text)}
 
 Provide in {language_name}:
 1. Key Medical Terms (5-8 important medical words/phrases)
@@ -426,13 +780,13 @@ INSTRUCTIONS:
 Write everything in {language_name} only.
 """
             
-            response = self.model.generate_content(prompt)
+            response = generate_content(self.model, prompt)
             
             if response.text:
                 return self._parse_medical_analysis(response.text)
             else:
                 return self._fallback_medical_concepts(text)
-                
+        
         except Exception as e:
             logger.error(f"Error extracting medical concepts: {str(e)}")
             return self._fallback_medical_concepts(text, target_language)
@@ -537,34 +891,34 @@ Write everything in {language_name} only.
         
         concepts_by_context = {
             'tagalog-rural': {
-                'key_terms': ['gamot', 'doktor', 'ospital', 'sakit', 'lunas'],
+                'key_terms': MEDICAL_TERMS_BY_LANGUAGE['tl'],
                 'medical_concepts': ['Pangangalaga ng kalusugan', 'Pagsunod sa gamot', 'Regular na checkup'],
                 'instructions': ['Uminom ng gamot ayon sa tagubilin', 'Makipag-ugnayan sa doktor kung may tanong']
             },
             'thai-low-literacy': {
-                'key_terms': ['ยา', 'หมอ', 'โรงพยาบาล', 'อาการ', 'การรักษา'],
+                'key_terms': MEDICAL_TERMS_BY_LANGUAGE['th'],
                 'medical_concepts': ['การดูแลสุขภาพ', 'การทานยา', 'การตรวจสุขภาพ'],
                 'instructions': ['ทานยาตามแพทย์สั่ง', 'ติดต่อแพทย์หากมีข้อสงสัย']
             },
             'khmer-indigenous': {
-                'key_terms': ['ថ្នាំ', 'វេជ្ជបណ្ឌិត', 'មន្ទីរពេទ្យ', 'រោគសញ្ញា', 'ការព្យាបាល'],
+                'key_terms': MEDICAL_TERMS_BY_LANGUAGE['km'],
                 'medical_concepts': ['ការថែទាំសុខភាព', 'ការញ៉ាំថ្នាំ', 'ការពិនិត្យសុខភាព'],
                 'instructions': ['ញ៉ាំថ្នាំតាមការណែនាំ', 'ទាក់ទងវេជ្ជបណ្ឌិតប្រសិនបើមានសំណួរ']
             },
             'vietnamese-elderly': {
-                'key_terms': ['thuốc', 'bác sĩ', 'bệnh viện', 'triệu chứng', 'điều trị'],
+                'key_terms': MEDICAL_TERMS_BY_LANGUAGE['vi'],
                 'medical_concepts': ['Chăm sóc sức khỏe', 'Uống thuốc đúng cách', 'Khám sức khỏe định kỳ'],
                 'instructions': ['Uống thuốc theo chỉ định', 'Liên hệ bác sĩ nếu có thắc mắc']
             },
             'malay-traditional': {
-                'key_terms': ['ubat', 'doktor', 'hospital', 'simptom', 'rawatan'],
+                'key_terms': MEDICAL_TERMS_BY_LANGUAGE['ms'],
                 'medical_concepts': ['Penjagaan kesihatan', 'Pengambilan ubat', 'Pemeriksaan kesihatan'],
                 'instructions': ['Ambil ubat mengikut arahan', 'Hubungi doktor jika ada pertanyaan']
             }
         }
         
         return concepts_by_context.get(context_key, concepts_by_context['malay-traditional'])
-
+    
     def _simple_summary(self, text: str) -> str:
         """Simple fallback summary"""
         if not text:
@@ -587,7 +941,7 @@ Write everything in {language_name} only.
             text (str): Extracted text from PDF
             cultural_context (str): Cultural context for adaptation
             target_language (str): Target language for output
-            
+        
         Returns:
             Dict containing analysis result
         """
@@ -600,7 +954,7 @@ Write everything in {language_name} only.
             prompt = self._build_gemini_analysis_prompt(text, cultural_context, target_language)
             
             # Generate response using Gemini
-            response = self.model.generate_content(prompt)
+            response = generate_content(self.model, prompt)
             
             if not response or not response.text:
                 logger.error("Empty response from Gemini API")
@@ -616,11 +970,50 @@ Write everything in {language_name} only.
                 'cultural_context': cultural_context,
                 'target_language': target_language
             }
-            
+        
         except Exception as e:
             logger.error(f"Error in Gemini analysis: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def stream_analysis_with_gemini(self, text: str, cultural_context: str = 'general', target_language: str = 'en') -> Iterator[str]:
+        """
+        Stream PDF analysis from Gemini as it is generated
+        
+        Args:
+            text (str): Extracted text from PDF
+            cultural_context (str): Cultural context for adaptation
+            target_language (str): Target language for output
+        
+        Yields:
+            str: Successive pieces of the formatted analysis
+        
+        Raises:
+            RuntimeError: If Gemini is unavailable or returns nothing
+        """
+        if not self.model:
+            raise RuntimeError('Gemini AI not available')
+        
+        prompt = self._build_gemini_analysis_prompt(text, cultural_context, target_language)
+        response = self.model.generate_content(prompt, stream=True)
+        chunks = usage_tracker.track_stream('gemini', self.model.model_name, prompt, (chunk.text for chunk in response))
+        
+        received = False
+        for text_chunk in chunks:
+            if not text_chunk:
+                continue
+            
+            # Hold the header back until Gemini has actually produced something
+            if not received:
+                received = True
+                yield ANALYSIS_HEADER
+            
+            yield text_chunk
+        
+        if not received:
+            raise RuntimeError('Empty response from Gemini')
+        
+        yield self._get_closing_note(target_language)
+    
     def _build_gemini_analysis_prompt(self, text: str, cultural_context: str, target_language: str) -> str:
         """Build enhanced prompt for Gemini analysis"""
         
@@ -646,11 +1039,14 @@ Write everything in {language_name} only.
         language_instruction = language_instructions.get(target_language, language_instructions['en'])
         cultural_note = cultural_notes.get(cultural_context, 'Consider general healthcare best practices.')
         
+        # Long documents arrive as map-reduce notes; this prompt is the final reduce pass
+        document_text = self.summarizer.condense(text)
+        
         prompt = f"""
 You are a medical communication expert helping patients understand their medical documents.
 
 DOCUMENT CONTENT:
-{text[:3000]}  # Limit text to avoid token limits
+{document_text}
 
 INSTRUCTIONS:
 1. {language_instruction}
@@ -699,6 +1095,19 @@ Make sure your response is culturally appropriate and considers the patient's li
         
         return prompt
     
+    def _get_closing_note(self, target_language: str) -> str:
+        """Language-specific closing note appended to every analysis"""
+        closing_notes = {
+            'en': "\n\n💬 **Note**: If you have questions about this information, please contact your healthcare provider.",
+            'tl': "\n\n💬 **Paalala**: Kung may mga tanong kayo tungkol sa impormasyong ito, makipag-ugnayan sa inyong healthcare provider.",
+            'th': "\n\n💬 **หมายเหตุ**: หากมีคำถามเกี่ยวกับข้อมูลนี้ กรุณาติดต่อผู้ให้บริการทางการแพทย์ของคุณ",
+            'vi': "\n\n💬 **Lưu ý**: Nếu bạn có câu hỏi về thông tin này, vui lòng liên hệ với nhà cung cấp dịch vụ chăm sóc sức khỏe của bạn.",
+            'ms': "\n\n💬 **Nota**: Jika anda mempunyai soalan mengenai maklumat ini, sila hubungi penyedia penjagaan kesihatan anda.",
+            'km': "\n\n💬 **ចំណាំ**: ប្រសិនបើអ្នកមានសំណួរអំពីព័ត៌មាននេះ សូមទាក់ទងអ្នកផ្តល់សេវាថែទាំសុខភាពរបស់អ្នក។"
+        }
+        
+        return closing_notes.get(target_language, closing_notes['en'])
+    
     def _process_gemini_response(self, response_text: str, target_language: str) -> str:
         """Process and format Gemini response"""
         try:
@@ -708,24 +1117,13 @@ Make sure your response is culturally appropriate and considers the patient's li
             # Ensure proper formatting
             if not cleaned_response.startswith('🏥'):
                 # Add a header if not present
-                header = "📄 **MEDICAL DOCUMENT ANALYSIS**\n\n"
-                cleaned_response = header + cleaned_response
+                cleaned_response = ANALYSIS_HEADER + cleaned_response
             
             # Add language-specific closing note
-            closing_notes = {
-                'en': "\n\n💬 **Note**: If you have questions about this information, please contact your healthcare provider.",
-                'tl': "\n\n💬 **Paalala**: Kung may mga tanong kayo tungkol sa impormasyong ito, makipag-ugnayan sa inyong healthcare provider.",
-                'th': "\n\n💬 **หมายเหตุ**: หากมีคำถามเกี่ยวกับข้อมูลนี้ กรุณาติดต่อผู้ให้บริการทางการแพทย์ของคุณ",
-                'vi': "\n\n💬 **Lưu ý**: Nếu bạn có câu hỏi về thông tin này, vui lòng liên hệ với nhà cung cấp dịch vụ chăm sóc sức khỏe của bạn.",
-                'ms': "\n\n💬 **Nota**: Jika anda mempunyai soalan mengenai maklumat ini, sila hubungi penyedia penjagaan kesihatan anda.",
-                'km': "\n\n💬 **ចំណាំ**: ប្រសិនបើអ្នកមានសំណួរអំពីព័ត៌មាននេះ សូមទាក់ទងអ្នកផ្តល់សេវាថែទាំសុខភាពរបស់អ្នក។"
-            }
-            
-            closing_note = closing_notes.get(target_language, closing_notes['en'])
-            cleaned_response += closing_note
+            cleaned_response += self._get_closing_note(target_language)
             
             return cleaned_response
-            
+        
         except Exception as e:
             logger.error(f"Error processing Gemini response: {str(e)}")
             return response_text  # Return original if processing fails
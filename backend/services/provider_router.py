@@ -0,0 +1,348 @@
+"""
+Provider Router for MediTalks
+Health-aware provider selection with per-provider circuit breakers and background recovery probes
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+class ProviderUnavailableError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open"""
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one provider
+    
+    Closed: calls flow and outcomes are recorded. Once the window holds at
+    least min_calls and the share of failed or slow calls reaches the
+    threshold, the circuit opens. Open: calls are rejected without touching
+    the network until open_seconds pass. Half-open: a single trial (a
+    recovery probe or one real call) decides whether to close or reopen.
+    """
+    
+    def __init__(self, name: str, window_seconds: float = 60, min_calls: int = 5, failure_rate: float = 0.5,
+                 slow_call_seconds: float = 20, open_seconds: float = 30):
+        """
+        Args:
+            name (str): Provider name
+            window_seconds (float): Age of the oldest outcome kept in the rolling window
+            min_calls (int): Outcomes needed in the window before the circuit can open
+            failure_rate (float): Share of failed or slow calls that opens the circuit
+            slow_call_seconds (float): Successful calls slower than this count as failures
+            open_seconds (float): Time the circuit stays open before a trial is allowed
+        """
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        
+        # (timestamp, failed, latency_seconds)
+        self._window = deque()
+        self._state = CIRCUIT_CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'failures': 0,
+            'slow_calls': 0,
+            'rejected': 0,
+            'opened': 0
+        }
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+    
+    def _current_state(self) -> str:
+        """State with the open cool-down applied (lock held)"""
+        if self._state == CIRCUIT_OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = CIRCUIT_HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+    
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now; half-open admits one trial at a time"""
+        with self._lock:
+            state = self._current_state()
+            
+            if state == CIRCUIT_CLOSED:
+                return True
+            
+            if state == CIRCUIT_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            
+            self._stats['rejected'] += 1
+            return False
+    
+    def is_available(self) -> bool:
+        """Whether calls would currently be admitted, without claiming the half-open trial"""
+        with self._lock:
+            state = self._current_state()
+            return state == CIRCUIT_CLOSED or (state == CIRCUIT_HALF_OPEN and not self._trial_in_flight)
+    
+    def record(self, failed: bool, latency_seconds: float):
+        """
+        Record the outcome of an admitted call
+        
+        Args:
+            failed (bool): Whether the call raised or timed out
+            latency_seconds (float): Time the call took
+        """
+        now = time.monotonic()
+        slow = not failed and latency_seconds >= self.slow_call_seconds
+        
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['failures'] += failed
+            self._stats['slow_calls'] += slow
+            
+            self._window.append((now, failed or slow, latency_seconds))
+            self._trim(now)
+            
+            if self._state == CIRCUIT_HALF_OPEN:
+                self._trial_in_flight = False
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._close()
+                return
+            
+            if self._state == CIRCUIT_CLOSED and len(self._window) >= self.min_calls:
+                failures = sum(1 for _, bad, _ in self._window if bad)
+                if failures / len(self._window) >= self.failure_rate:
+                    self._open(now)
+    
+    def release(self):
+        """Give back an admitted call that never reached the provider"""
+        with self._lock:
+            if self._state == CIRCUIT_HALF_OPEN:
+                self._trial_in_flight = False
+    
+    def _trim(self, now: float):
+        """Drop outcomes older than the window (lock held)"""
+        while self._window and now - self._window[0][0] > self.window_seconds:
+            self._window.popleft()
+    
+    def _open(self, now: float):
+        """Open the circuit (lock held)"""
+        self._state = CIRCUIT_OPEN
+        self._opened_at = now
+        self._stats['opened'] += 1
+        logger.warning(f"Circuit for {self.name} opened")
+    
+    def _close(self):
+        """Close the circuit and forget the failures that opened it (lock held)"""
+        self._state = CIRCUIT_CLOSED
+        self._window.clear()
+        logger.info(f"Circuit for {self.name} closed")
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """
+        Latency at a percentile of successful calls in the window
+        
+        Args:
+            percentile (float): 0-100
+        
+        Returns:
+            float: Seconds, or None if the window has no successful calls
+        """
+        with self._lock:
+            self._trim(time.monotonic())
+            latencies = sorted(latency for _, bad, latency in self._window if not bad)
+        
+        if not latencies:
+            return None
+        
+        index = min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))
+        return latencies[index]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get state, lifetime counters and rolling-window error rate and latency"""
+        with self._lock:
+            self._trim(time.monotonic())
+            stats = dict(self._stats)
+            stats['state'] = self._current_state()
+            window = list(self._window)
+        
+        failures = sum(1 for _, bad, _ in window if bad)
+        stats['window_calls'] = len(window)
+        stats['window_failure_rate'] = round(failures / len(window), 4) if window else 0.0
+        
+        p50, p95 = self.latency_percentile(50), self.latency_percentile(95)
+        stats['window_p50_seconds'] = round(p50, 4) if p50 is not None else None
+        stats['window_p95_seconds'] = round(p95, 4) if p95 is not None else None
+        return stats
+
+class ProviderRouter:
+    """
+    Chooses providers by circuit state and probes open circuits in the background
+    
+    Providers whose circuit is open are skipped at zero cost. A daemon thread
+    runs each provider's probe once its circuit turns half-open, so recovery
+    is detected without sacrificing a user request.
+    """
+    
+    def __init__(self, probe_interval_seconds: float = 5, **breaker_options):
+        """
+        Args:
+            probe_interval_seconds (float): How often half-open circuits are probed
+            **breaker_options: CircuitBreaker settings applied to every provider
+        """
+        self.probe_interval_seconds = probe_interval_seconds
+        self.breaker_options = breaker_options
+        
+        self._breakers = {}
+        self._probes = {}
+        self._lock = threading.Lock()
+        self._probe_thread = None
+        self._stop = threading.Event()
+    
+    def breaker(self, name: str) -> CircuitBreaker:
+        """Circuit breaker for a provider, created on first use"""
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, **self.breaker_options)
+                self._breakers[name] = breaker
+            return breaker
+    
+    def register_probe(self, name: str, probe: Callable[[], bool]):
+        """
+        Register a cheap health check for a provider and start the probe thread
+        
+        Args:
+            name (str): Provider name
+            probe: Callable returning True if the provider answered correctly
+        """
+        self.breaker(name)
+        
+        with self._lock:
+            self._probes[name] = probe
+            if self._probe_thread is None and self.probe_interval_seconds > 0:
+                self._probe_thread = threading.Thread(target=self._probe_loop, name='provider-probes', daemon=True)
+                self._probe_thread.start()
+    
+    def allow(self, name: str) -> bool:
+        """Whether a call may go to the provider now (claims the half-open trial if any)"""
+        return self.breaker(name).allow()
+    
+    def is_available(self, name: str) -> bool:
+        """Whether the provider's circuit currently admits calls"""
+        return self.breaker(name).is_available()
+    
+    def record(self, name: str, failed: bool, latency_seconds: float):
+        """Record the outcome of a call admitted by allow()"""
+        self.breaker(name).record(failed, latency_seconds)
+    
+    def release(self, name: str):
+        """Give back a call admitted by allow() that was never made"""
+        self.breaker(name).release()
+    
+    def guard_stream(self, name: str, tokens: Iterator[str]) -> Iterator[str]:
+        """
+        Pass a provider token stream through the provider's circuit
+        
+        Latency is the time to the first token, since total stream length
+        depends on the response size. A client disconnect is not a failure.
+        
+        Raises:
+            ProviderUnavailableError: If the provider's circuit is open
+        """
+        if not self.allow(name):
+            raise ProviderUnavailableError(f"{name} circuit is open")
+        
+        started = time.monotonic()
+        first_token_seconds = None
+        try:
+            for token in tokens:
+                if first_token_seconds is None:
+                    first_token_seconds = time.monotonic() - started
+                yield token
+        except GeneratorExit:
+            self.release(name)
+            raise
+        except Exception:
+            self.record(name, True, time.monotonic() - started)
+            raise
+        
+        self.record(name, False, first_token_seconds if first_token_seconds is not None else time.monotonic() - started)
+    
+    def select(self, candidates: List[str]) -> str:
+        """
+        Pick the first candidate whose circuit admits calls
+        
+        Args:
+            candidates (list): Provider names in order of preference
+        
+        Returns:
+            str: Chosen provider; the last candidate if every circuit is open,
+                 so callers reach its fast-failing template fallback
+        """
+        for name in candidates:
+            if self.is_available(name):
+                return name
+        return candidates[-1]
+    
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval_seconds):
+            with self._lock:
+                probes = list(self._probes.items())
+            
+            for name, probe in probes:
+                breaker = self.breaker(name)
+                if breaker.state != CIRCUIT_HALF_OPEN or not breaker.allow():
+                    continue
+                
+                started = time.monotonic()
+                try:
+                    healthy = bool(probe())
+                except Exception as e:
+                    logger.info(f"Recovery probe for {name} failed: {str(e)}")
+                    healthy = False
+                
+                breaker.record(not healthy, time.monotonic() - started)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get circuit stats per provider"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.get_stats() for name, breaker in breakers.items()}
+    
+    def close(self):
+        """Stop the probe thread"""
+        self._stop.set()
+
+_provider_router = None
+_provider_router_lock = threading.Lock()
+
+def get_provider_router() -> ProviderRouter:
+    """Process-wide provider router, created on first use so .env settings are loaded"""
+    global _provider_router
+    
+    with _provider_router_lock:
+        if _provider_router is None:
+            _provider_router = ProviderRouter(
+                probe_interval_seconds=float(os.getenv('CIRCUIT_PROBE_INTERVAL_SECONDS', '5')),
+                window_seconds=float(os.getenv('CIRCUIT_WINDOW_SECONDS', '60')),
+                min_calls=int(os.getenv('CIRCUIT_MIN_CALLS', '5')),
+                failure_rate=float(os.getenv('CIRCUIT_FAILURE_RATE', '0.5')),
+                slow_call_seconds=float(os.getenv('CIRCUIT_SLOW_CALL_SECONDS', '20')),
+                open_seconds=float(os.getenv('CIRCUIT_OPEN_SECONDS', '30'))
+            )
+        return _provider_router
@@ -4,16 +4,43 @@ Handles cultural adaptation using SEA-Lion LLM specifically designed for Southea
 """
 
 import os
+import json
+import time
+import random
 import logging
+import threading
 import requests
-from typing import Dict, Any, Optional
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterator, Optional
+from services.llm_providers import RETRY_STATUS_CODES, SEALionProvider, get_llm_providers
+from utils.llm_usage import usage_tracker
 
 logger = logging.getLogger(__name__)
 
+SEALION_MODEL = "sealion-7b-instruct"
+
 class SEALionService:
     def __init__(self):
         self.api_key = os.getenv('SEALION_API_KEY')
         self.api_url = os.getenv('SEALION_API_URL', 'https://api.sealion.ai/v1')
+        
+        # Connect fails fast; read allows for long generations
+        self.timeout = (
+            float(os.getenv('SEALION_CONNECT_TIMEOUT', '3.05')),
+            float(os.getenv('SEALION_READ_TIMEOUT', '30'))
+        )
+        self.max_retries = int(os.getenv('SEALION_MAX_RETRIES', '3'))
+        self.backoff_base = float(os.getenv('SEALION_BACKOFF_BASE', '0.5'))
+        self.backoff_max = float(os.getenv('SEALION_BACKOFF_MAX', '8'))
+        
+        # Keep-alive connection pools: the session serves streams, the provider layer everything else
+        self.pool_size = int(os.getenv('SEALION_POOL_SIZE', '10'))
+        self.session = self._create_session(self.pool_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'retries': 0, 'failures': 0}
+        get_llm_providers().register(SEALionProvider(self))
+        
         self.available = self._initialize_sealion()
         
         # SEA-Lion specific cultural context templates optimized for Southeast Asian cultures
@@ -60,55 +87,252 @@ class SEALionService:
                 logger.warning("SEA-Lion API key not configured, will use fallback")
                 return False
             
-            # Test connection
-            test_response = self._make_api_request("Test connection", "en", max_tokens=10)
-            logger.info(f"SEA-Lion API connection successful: {bool(test_response)}")
+            # The connection is tested by warm_up() in the background, not at import time
             return True
             
         except Exception as e:
             logger.error(f"Failed to initialize SEA-Lion API: {str(e)}")
             return False
 
-    def _make_api_request(self, prompt: str, language: str = "en", max_tokens: int = 500) -> Optional[str]:
-        """Make request to SEA-Lion API"""
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+    def warm_up(self) -> bool:
+        """Test the API connection and open pooled connections; run in the background after startup"""
+        if not self.available:
+            return False
+        
+        test_response = self._make_api_request("Test connection", "en", max_tokens=10)
+        logger.info(f"SEA-Lion API connection successful: {bool(test_response)}")
+        return bool(test_response)
+
+    def _create_session(self, pool_size: int) -> requests.Session:
+        """Session with a pooled keep-alive adapter; retries are handled by _post"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update(self._build_headers())
+        return session
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> Optional[float]:
+        """
+        Seconds to wait before retry number attempt + 1, or None to give up
+        
+        Retry-After is honoured when present; otherwise the delay is full-jitter
+        exponential backoff so retrying workers do not stampede the API together.
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
             
-            # SEA-Lion API payload structure (adjust based on actual API documentation)
-            payload = {
-                "model": "sealion-7b-instruct",  # or appropriate model name
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "max_tokens": max_tokens,
-                "temperature": 0.7,
-                "language": language
-            }
+            if delay is not None:
+                # Waiting longer than the backoff cap would stall the worker; fail instead
+                return max(0.0, delay) if delay <= self.backoff_max else None
+        
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _next_retry(self, attempt: int, response, error: Optional[Exception]) -> Optional[float]:
+        """
+        Retry decision shared by _post and the async SEALionProvider
+        
+        Args:
+            attempt (int): 0-based attempt that just finished
+            response: Its response (requests or httpx), or None if it raised
+            error: The retryable transport error it raised, if any
+        
+        Returns:
+            Seconds to sleep before retrying, or None if response is final
+        
+        Raises:
+            The transport error once retries are exhausted
+        """
+        if error is None and response.status_code not in RETRY_STATUS_CODES:
+            return None
+        
+        delay = self._retry_delay(attempt, response) if attempt < self.max_retries else None
+        if delay is None:
+            self._count('failures')
+            if error is not None:
+                raise error
+            return None
+        
+        self._count('retries')
+        logger.warning(f"SEA-Lion request failed ({error or response.status_code}), retrying in {delay:.2f}s")
+        return delay
+
+    def _post(self, payload: Dict[str, Any], stream: bool = False) -> requests.Response:
+        """
+        POST a chat completion, retrying connection failures, 429 and 5xx responses
+        
+        Returns:
+            The final response (possibly an error status once retries are exhausted)
+        
+        Raises:
+            requests.RequestException: On a read timeout or if every attempt failed to connect
+        """
+        self._count('requests')
+        
+        for attempt in range(self.max_retries + 1):
+            response = error = None
+            try:
+                response = self.session.post(
+                    f"{self.api_url}/chat/completions",
+                    json=payload,
+                    timeout=self.timeout,
+                    stream=stream
+                )
+            except requests.ConnectionError as e:
+                # Includes connect timeouts and dropped connections; read timeouts are
+                # not retried since the model may still be generating
+                error = e
             
-            response = requests.post(
-                f"{self.api_url}/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            delay = self._next_retry(attempt, response, error)
+            if delay is None:
+                return response
             
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("choices", [{}])[0].get("message", {}).get("content", "")
-            else:
-                logger.error(f"SEA-Lion API error: {response.status_code} - {response.text}")
-                return None
+            # Release the connection back to the pool before sleeping
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request, retry and failure counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['available'] = self.available
+        return stats
+
+    def _build_headers(self) -> Dict[str, str]:
+        """Request headers for the SEA-Lion API"""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _build_payload(self, prompt: str, language: str, max_tokens: int) -> Dict[str, Any]:
+        """Chat completion payload for the SEA-Lion API"""
+        # SEA-Lion API payload structure (adjust based on actual API documentation)
+        return {
+            "model": SEALION_MODEL,  # or appropriate model name
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.7,
+            "language": language
+        }
+
+    def _make_api_request(self, prompt: str, language: str = "en", max_tokens: int = 500) -> Optional[str]:
+        """Make request to SEA-Lion API through the shared async provider layer"""
+        try:
+            result = get_llm_providers().generate("sealion", prompt, language=language, max_tokens=max_tokens)
+            return result.text
                 
         except Exception as e:
             logger.error(f"Error making SEA-Lion API request: {str(e)}")
             return None
 
+    def _stream_api_request(self, prompt: str, language: str = "en", max_tokens: int = 500) -> Iterator[str]:
+        """
+        Stream a chat completion from the SEA-Lion API using the OpenAI-style SSE protocol
+        
+        Yields:
+            str: Content deltas as they arrive
+        
+        Raises:
+            RuntimeError: On HTTP errors or malformed stream events
+        """
+        payload = self._build_payload(prompt, language, max_tokens)
+        payload["stream"] = True
+        
+        with self._post(payload, stream=True) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"SEA-Lion API error: {response.status_code} - {response.text}")
+            
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                
+                try:
+                    event = json.loads(data)
+                except ValueError as e:
+                    raise RuntimeError(f"Malformed SEA-Lion stream event: {str(e)}")
+                
+                delta = (event.get("choices") or [{}])[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+    def stream_cultural_adaptation(self, message: str, cultural_context: str) -> Iterator[str]:
+        """
+        Stream a culturally adapted medical message from SEA-Lion
+        
+        Args:
+            message (str): Original medical message
+            cultural_context (str): Target cultural context
+        
+        Yields:
+            str: Successive pieces of the adapted message
+        
+        Raises:
+            RuntimeError: If SEA-Lion is unavailable, the context is unknown, the stream fails or returns no text
+        """
+        if not self.available:
+            raise RuntimeError("SEA-Lion API not available")
+        
+        context_info = self.sea_context_templates.get(cultural_context, {})
+        if not context_info:
+            raise RuntimeError(f"Unknown cultural context for SEA-Lion: {cultural_context}")
+        
+        prompt = self._build_sealion_prompt(message, context_info)
+        language_code = self._get_language_code(context_info.get('language', 'English'))
+        
+        logger.info(f"Streaming cultural adaptation with SEA-Lion for {cultural_context}")
+        tokens = self._stream_api_request(prompt, language_code, max_tokens=800)
+        
+        received = False
+        for token in usage_tracker.track_stream("sealion", SEALION_MODEL, prompt, tokens):
+            if token:
+                received = True
+                yield token
+        
+        if not received:
+            raise RuntimeError("Empty response from SEA-Lion")
+
+    def get_fallback_adaptation(self, message: str, cultural_context: str) -> str:
+        """Template adaptation used when SEA-Lion fails"""
+        return self._fallback_adaptation(message, cultural_context)
+
+    def build_adaptation_call(self, message: str, cultural_context: str) -> Optional[tuple]:
+        """
+        Describe an adaptation as a provider call for the LLM provider layer
+        
+        Returns:
+            tuple: (provider name, prompt, options), or None if SEA-Lion cannot take this context
+        """
+        context_info = self.sea_context_templates.get(cultural_context)
+        if not self.available or not context_info:
+            return None
+        
+        prompt = self._build_sealion_prompt(message, context_info)
+        language_code = self._get_language_code(context_info.get('language', 'English'))
+        return 'sealion', prompt, {'language': language_code, 'max_tokens': 800}
+
     def generate_cultural_adaptation(self, message: str, cultural_context: str) -> str:
         """
         Generate culturally adapted medical message using SEA-Lion
@@ -118,16 +342,29 @@ class SEALionService:
             cultural_context (str): Target cultural context
             
         Returns:
-            str: Culturally adapted message
+            str: Culturally adapted message, or the template fallback if SEA-Lion failed
+        """
+        return self.try_cultural_adaptation(message, cultural_context) or self._fallback_adaptation(message, cultural_context)
+
+    def try_cultural_adaptation(self, message: str, cultural_context: str) -> Optional[str]:
+        """
+        Generate culturally adapted medical message using SEA-Lion, without the template fallback
+        
+        Args:
+            message (str): Original medical message
+            cultural_context (str): Target cultural context
+        
+        Returns:
+            str: Culturally adapted message, or None if SEA-Lion could not adapt it
         """
         try:
             if not self.available:
-                return self._fallback_adaptation(message, cultural_context)
+                return None
             
             context_info = self.sea_context_templates.get(cultural_context, {})
             if not context_info:
                 logger.warning(f"Unknown cultural context for SEA-Lion: {cultural_context}")
-                return self._fallback_adaptation(message, cultural_context)
+                return None
             
             # Build SEA-Lion specific prompt optimized for Southeast Asian cultural adaptation
             prompt = self._build_sealion_prompt(message, context_info)
@@ -138,16 +375,21 @@ class SEALionService:
             logger.info(f"Generating cultural adaptation with SEA-Lion for {cultural_context}")
             response = self._make_api_request(prompt, language_code, max_tokens=800)
             
-            if response and response.strip():
+            adapted_message = self.finish_adaptation(response)
+            if adapted_message:
                 logger.info(f"Successfully adapted message with SEA-Lion for {cultural_context}")
-                return response.strip()
+                return adapted_message
             else:
                 logger.warning("SEA-Lion returned empty response, using fallback")
-                return self._fallback_adaptation(message, cultural_context)
+                return None
                 
         except Exception as e:
             logger.error(f"Error generating adaptation with SEA-Lion: {str(e)}")
-            return self._fallback_adaptation(message, cultural_context)
+            return None
+
+    def finish_adaptation(self, text: Optional[str]) -> Optional[str]:
+        """Clean up raw SEA-Lion adaptation text; None if nothing usable is left"""
+        return (text or '').strip() or None
 
     def _build_sealion_prompt(self, message: str, context_info: Dict[str, str]) -> str:
         """Build SEA-Lion specific prompt for cultural adaptation"""
@@ -265,9 +507,19 @@ Summary in {target_language}:"""
         return summary or "Medical document processed successfully."
 
     def is_available(self) -> bool:
-        """Check if SEA-Lion service is available"""
+        """Check if SEA-Lion service is configured; live health is tracked by the provider router"""
         return self.available
 
+    def probe(self) -> bool:
+        """Single cheap completion used as a recovery probe, without retries"""
+        response = self.session.post(
+            f"{self.api_url}/chat/completions",
+            json=self._build_payload("ping", "en", 1),
+            timeout=self.timeout
+        )
+        with response:
+            return response.status_code == 200
+
     def get_supported_contexts(self) -> list:
         """Get list of supported cultural contexts"""
         return list(self.sea_context_templates.keys())
@@ -4,16 +4,37 @@ Handles text analysis and summarization using various methods
 """
 
 import os
+import re
+import json
+import time
 import logging
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+from concurrent.futures import ThreadPoolExecutor, wait
 import google.generativeai as genai
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 from dotenv import load_dotenv
+from services.map_reduce_summarizer import MapReduceSummarizer
+from utils.keyword_matcher import KEY_POINT_MATCHER
+from services.llm_providers import generate_content
+from services.model_registry import ROLE_SUMMARIZATION, get_model_registry
+from utils.llm_usage import usage_tracker
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Models tried after the configured summarization model if it does not answer
+GEMINI_MODEL_NAMES = ('gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro')
+
+# Ways analyze_and_summarize can call Gemini
+SUMMARY_MODES = ('serial', 'concurrent', 'combined')
+
+# Markdown code fences Gemini sometimes wraps JSON in
+_CODE_FENCE_PATTERN = re.compile(r'^```(?:json)?\s*|\s*```$')
+
 class TextSummarizationService:
     """Service for text analysis and summarization"""
     
@@ -21,9 +42,30 @@ class TextSummarizationService:
         self.api_key = os.getenv('GEMINI_API_KEY')
         self.model = None
         self._initialize_gemini()
+        
+        # Long documents are condensed chunk by chunk instead of truncated
+        self.summarizer = MapReduceSummarizer(self._generate_text)
+        
+        # Summary and key points run side by side under one deadline
+        self.summary_mode = os.getenv('SUMMARY_MODE', 'concurrent')
+        self.deadline_seconds = float(os.getenv('SUMMARY_DEADLINE_SECONDS', '30'))
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('SUMMARY_MAX_WORKERS', '4')),
+            thread_name_prefix='summary'
+        )
+        self._deadline_stats = {'requests': 0, 'missed_deadline': 0, 'abandoned_calls': 0}
+        self._deadline_lock = threading.Lock()
+    
+    def _generate_text(self, prompt: str) -> Optional[str]:
+        """Send a prompt to Gemini and return the response text"""
+        if not self.model:
+            return None
+        
+        response = generate_content(self.model, prompt)
+        return response.text if response else None
     
     def _initialize_gemini(self):
-        """Initialize Google Gemini AI"""
+        """Initialize Google Gemini AI with the preferred model; warm_up() verifies it in the background"""
         try:
             logger.info(f"Initializing Gemini AI...")
             logger.info(f"API key present: {bool(self.api_key)}")
@@ -33,41 +75,58 @@ class TextSummarizationService:
                 logger.error("GEMINI_API_KEY not found in environment variables")
                 return False
             
-            genai.configure(api_key=self.api_key)
-            
-            # Try to list available models
-            try:
-                models = genai.list_models()
-                logger.info(f"Available models: {[model.name for model in models]}")
-            except Exception as e:
-                logger.warning(f"Could not list models: {e}")
-            
-            # Try different model names
-            model_names = ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro']
-            
-            for model_name in model_names:
-                try:
-                    logger.info(f"Trying model: {model_name}")
-                    self.model = genai.GenerativeModel(model_name)
-                    
-                    # Test the connection
-                    test_response = self.model.generate_content("Test connection")
-                    logger.info(f"Test connection successful with {model_name}: {bool(test_response.text)}")
-                    logger.info("Gemini AI initialized for text summarization")
-                    return True
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to initialize with {model_name}: {str(e)}")
-                    continue
-            
-            logger.error("Failed to initialize with any available model")
-            return False
+            self.model = get_model_registry().get_model(ROLE_SUMMARIZATION)
+            logger.info("Gemini AI initialized for text summarization")
+            return True
             
         except Exception as e:
             logger.error(f"Failed to initialize Gemini AI: {str(e)}")
             return False
     
-    def analyze_and_summarize(self, text: str, target_language: str = 'en', summary_length: str = 'medium') -> Dict[str, Any]:
+    def warm_up(self) -> bool:
+        """
+        Find the first model that answers a test request and switch to it
+        
+        Runs in the background after startup; requests arriving earlier use
+        the preferred model chosen by _initialize_gemini.
+        
+        Returns:
+            bool: True if a model answered
+        """
+        if not self.model:
+            return False
+        
+        # Try to list available models
+        try:
+            models = genai.list_models()
+            logger.info(f"Available models: {[model.name for model in models]}")
+        except Exception as e:
+            logger.warning(f"Could not list models: {e}")
+        
+        registry = get_model_registry()
+        model_names = dict.fromkeys((registry.model_name(ROLE_SUMMARIZATION),) + GEMINI_MODEL_NAMES)
+        
+        for model_name in model_names:
+            try:
+                logger.info(f"Trying model: {model_name}")
+                model = registry.get_model(ROLE_SUMMARIZATION, model_name)
+                
+                # Test the connection
+                test_response = model.generate_content("Test connection")
+                logger.info(f"Test connection successful with {model_name}: {bool(test_response.text)}")
+                registry.assign(ROLE_SUMMARIZATION, model_name)
+                self.model = model
+                return True
+            
+            except Exception as e:
+                logger.warning(f"Failed to initialize with {model_name}: {str(e)}")
+                continue
+        
+        logger.error("Failed to initialize with any available model")
+        return False
+    
+    def analyze_and_summarize(self, text: str, target_language: str = 'en', summary_length: str = 'medium',
+                              mode: Optional[str] = None) -> Dict[str, Any]:
         """
         Analyze and summarize text content
         
@@ -75,6 +134,8 @@ class TextSummarizationService:
             text (str): Text to analyze and summarize
             target_language (str): Target language for summary
             summary_length (str): Length of summary ('short', 'medium', 'long')
+            mode (str): 'serial', 'concurrent' (both calls in parallel) or 'combined'
+                (one structured call); defaults to SUMMARY_MODE
             
         Returns:
             Dict containing analysis results
@@ -93,11 +154,23 @@ class TextSummarizationService:
             word_count = len(text.split())
             char_count = len(text)
             
-            # Generate summary
-            summary = self._generate_summary(text, target_language, summary_length)
+            # Condense long documents once so both prompts cover every page
+            document_text = self.summarizer.condense(text) if self.model else text
             
-            # Extract key points
-            key_points = self._extract_key_points(text, target_language)
+            mode = mode or self.summary_mode
+            if mode not in SUMMARY_MODES:
+                logger.warning(f"Unknown summary mode {mode}, using concurrent")
+                mode = 'concurrent'
+            
+            combined = self._generate_combined(document_text, target_language, summary_length) if mode == 'combined' else None
+            
+            if combined:
+                summary, key_points = combined
+            elif mode == 'serial':
+                summary = self._generate_summary(document_text, target_language, summary_length)
+                key_points = self._extract_key_points(document_text, target_language)
+            else:
+                summary, key_points = self._generate_concurrently(document_text, target_language, summary_length)
             
             return {
                 'success': True,
@@ -119,8 +192,130 @@ class TextSummarizationService:
                 'word_count': len(text.split()) if text else 0
             }
     
-    def _generate_summary(self, text: str, target_language: str, summary_length: str) -> str:
-        """Generate summary using Gemini AI or fallback method"""
+    def _generate_concurrently(self, text: str, target_language: str, summary_length: str) -> tuple:
+        """
+        Generate summary and key points in parallel under a shared deadline
+        
+        Each Gemini call is given only the time left before the deadline, so a
+        call still running at the deadline is cancelled on the provider loop and
+        its executor thread freed, instead of running on unobserved. Its result
+        is replaced by the local fallback, so the response time is bounded by
+        the deadline rather than the sum of both round-trips.
+        
+        Returns:
+            tuple: (summary, key_points)
+        """
+        deadline = time.monotonic() + self.deadline_seconds
+        
+        summary_future = self._executor.submit(
+            usage_tracker.wrap(self._call_before), deadline, self._generate_summary, text, target_language, summary_length
+        )
+        key_points_future = self._executor.submit(
+            usage_tracker.wrap(self._call_before), deadline, self._extract_key_points, text, target_language
+        )
+        
+        wait([summary_future, key_points_future], timeout=self.deadline_seconds)
+        
+        abandoned = 0
+        
+        if summary_future.done():
+            summary = summary_future.result()
+        else:
+            logger.warning(f"Summary missed the {self.deadline_seconds}s deadline, using fallback")
+            summary_future.cancel()
+            summary = self._fallback_summary(text)
+            abandoned += 1
+        
+        if key_points_future.done():
+            key_points = key_points_future.result()
+        else:
+            logger.warning(f"Key points missed the {self.deadline_seconds}s deadline, using fallback")
+            key_points_future.cancel()
+            key_points = self._fallback_key_points(text)
+            abandoned += 1
+        
+        with self._deadline_lock:
+            self._deadline_stats['requests'] += 1
+            self._deadline_stats['missed_deadline'] += bool(abandoned)
+            self._deadline_stats['abandoned_calls'] += abandoned
+        
+        return summary, key_points
+    
+    def _call_before(self, deadline: float, generate: Callable, *args):
+        """Run a generation step with its Gemini call bounded by the time left until deadline"""
+        return generate(*args, timeout=max(0.0, deadline - time.monotonic()))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get concurrent-mode request counts and calls abandoned at the deadline"""
+        with self._deadline_lock:
+            stats = dict(self._deadline_stats)
+        stats['mode'] = self.summary_mode
+        stats['deadline_seconds'] = self.deadline_seconds
+        return stats
+    
+    def _generate_combined(self, text: str, target_language: str, summary_length: str) -> Optional[tuple]:
+        """
+        Generate summary and key points with a single structured Gemini call
+        
+        Returns:
+            tuple: (summary, key_points), or None if the call fails or the response is not valid JSON
+        """
+        if not self.model:
+            return None
+        
+        length_instructions = {
+            'short': '1-2 sentences',
+            'medium': '3-4 sentences',
+            'long': '5-6 sentences'
+        }
+        
+        language_names = {
+            'en': 'English',
+            'th': 'Thai',
+            'vi': 'Vietnamese',
+            'ms': 'Malay',
+            'km': 'Khmer',
+            'tl': 'Tagalog'
+        }
+        
+        length_instruction = length_instructions.get(summary_length, '3-4 sentences')
+        language_name = language_names.get(target_language, 'English')
+        
+        prompt = f"""
+Analyze the following text and write everything in {language_name} ONLY. Do not use English.
+Respond with a JSON object with exactly two fields:
+- "summary": a summary of {length_instruction} focusing on the most important medical information
+- "key_points": a list of 3-5 short key points, prioritizing medical instructions, warnings and key health information
+
+Text:
+{text}
+"""
+        
+        try:
+            response = generate_content(self.model, prompt, generation_config={'response_mime_type': 'application/json'})
+            result = json.loads(_CODE_FENCE_PATTERN.sub('', response.text.strip()))
+            
+            summary = result.get('summary')
+            key_points = result.get('key_points')
+            
+            if not isinstance(summary, str) or not summary.strip() or not isinstance(key_points, list):
+                raise ValueError('Missing summary or key_points')
+            
+            key_points = [str(point).strip() for point in key_points if str(point).strip()]
+            return summary.strip(), key_points[:5]
+        
+        except Exception as e:
+            logger.warning(f"Combined summary call failed, falling back to separate calls: {str(e)}")
+            return None
+    
+    def _generate_summary(self, text: str, target_language: str, summary_length: str,
+                          timeout: Optional[float] = None) -> str:
+        """
+        Generate summary using Gemini AI or fallback method
+        
+        text is the document as condensed by analyze_and_summarize, used in the
+        prompt as is; timeout bounds the Gemini call.
+        """
         try:
             logger.info(f"_generate_summary called with language: {target_language}, length: {summary_length}")
             logger.info(f"Text length to summarize: {len(text)}")
@@ -164,11 +359,11 @@ If this is medical content, prioritize key medical information, instructions, an
 Write everything in {language_name} only.
 
 Text to summarize:
-{text[:2000]}  # Limit for API efficiency
+{text}
 """
             
             logger.info(f"Sending prompt to Gemini AI...")
-            response = self.model.generate_content(prompt)
+            response = generate_content(self.model, prompt, timeout=timeout)
             logger.info(f"Gemini AI response received: {response.text[:100] if response.text else 'No response text'}")
             
             if response.text:
@@ -181,8 +376,8 @@ Text to summarize:
             logger.error(f"Error generating summary with Gemini: {str(e)}")
             return self._fallback_summary(text)
     
-    def _extract_key_points(self, text: str, target_language: str) -> list:
-        """Extract key points from text"""
+    def _extract_key_points(self, text: str, target_language: str, timeout: Optional[float] = None) -> list:
+        """Extract key points from already condensed text; timeout bounds the Gemini call"""
         try:
             if not self.model:
                 return self._fallback_key_points(text)
@@ -206,10 +401,10 @@ If this is medical content, prioritize medical instructions, warnings, and key h
 Write everything in {language_name} only.
 
 Text:
-{text[:2000]}
+{text}
 """
             
-            response = self.model.generate_content(prompt)
+            response = generate_content(self.model, prompt, timeout=timeout)
             
             if response.text:
                 # Parse bullet points
@@ -261,17 +456,17 @@ Text:
             return []
         
         # Simple approach: extract sentences with medical keywords
-        medical_keywords = [
-            'medication', 'dose', 'treatment', 'doctor', 'hospital', 
-            'symptoms', 'diagnosis', 'prescription', 'important', 'warning'
-        ]
-        
         sentences = text.split('.')
         key_points = []
         
-        for sentence in sentences[:10]:  # Check first 10 sentences
+        # One matcher pass over the first 10 sentences, hits bucketed by sentence
+        candidates = sentences[:10]
+        sentence_ends = list(accumulate(len(sentence) + 1 for sentence in candidates))
+        matched = {bisect_right(sentence_ends, start) for start, _, _ in KEY_POINT_MATCHER.find_all('.'.join(candidates))}
+        
+        for index, sentence in enumerate(candidates):
             sentence = sentence.strip()
-            if any(keyword.lower() in sentence.lower() for keyword in medical_keywords):
+            if index in matched:
                 if len(sentence) > 10 and len(sentence) < 200:
                     key_points.append(sentence)
                     if len(key_points) >= 3:
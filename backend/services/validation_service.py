@@ -6,6 +6,7 @@ Handles input validation and content filtering
 import re
 import logging
 from typing import Dict, Any, List
+from utils.keyword_matcher import MEDICAL_CONTENT_MATCHER
 
 logger = logging.getLogger(__name__)
 
@@ -176,16 +177,7 @@ class ValidationService:
         Returns:
             bool: True if message appears to be medical-related
         """
-        medical_keywords = [
-            'medicine', 'medication', 'doctor', 'hospital', 'clinic', 'treatment',
-            'diagnosis', 'symptoms', 'patient', 'health', 'medical', 'prescription',
-            'dose', 'dosage', 'therapy', 'surgery', 'examination', 'consultation',
-            'healthcare', 'illness', 'disease', 'condition', 'recovery', 'healing',
-            'pain', 'fever', 'infection', 'vaccine', 'immunization', 'checkup'
-        ]
-        
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in medical_keywords)
+        return MEDICAL_CONTENT_MATCHER.contains_any(message)
     
     def sanitize_input(self, text: str) -> str:
         """
@@ -0,0 +1,54 @@
+from utils.boilerplate_filter import BoilerplateFilter
+
+def _pages(count, top_lines, bottom_lines):
+    pages = []
+    for index in range(count):
+        lines = top_lines(index) + [f"Body paragraph {line} of the leaflet for page {index}" for line in range(10)] + bottom_lines(index)
+        pages.append({'page_number': index + 1, 'text': '\n'.join(lines)})
+    return pages
+
+def test_strips_repeated_header_footer_and_page_counter():
+    pages = _pages(
+        6,
+        lambda index: ["St Mary Hospital Patient Leaflet"],
+        lambda index: ["Confidential - for patient use only", f"Page {index + 1} of 6"]
+    )
+    
+    boilerplate_filter = BoilerplateFilter()
+    filtered = list(boilerplate_filter.filter_pages(pages))
+    
+    assert boilerplate_filter.get_stats()['lines_removed'] == 18
+    for page in filtered:
+        assert "St Mary Hospital" not in page['text']
+        assert "Page " not in page['text']
+        assert "Body paragraph 0" in page['text']
+
+def test_keeps_dosage_lines_in_header_and_footer_positions():
+    pages = _pages(
+        6,
+        lambda index: ["St Mary Hospital Patient Leaflet", f"Take paracetamol {500 + index * 25} mg twice a day"],
+        lambda index: [f"Then take {index + 1} tablets at night", f"Page {index + 1} of 6"]
+    )
+    
+    filtered = list(BoilerplateFilter().filter_pages(pages))
+    
+    for index, page in enumerate(filtered):
+        assert f"Take paracetamol {500 + index * 25} mg twice a day" in page['text']
+        assert f"Then take {index + 1} tablets at night" in page['text']
+        assert "St Mary Hospital" not in page['text']
+
+def test_keeps_first_copy_of_repeated_body_line():
+    pages = []
+    for index in range(6):
+        lines = ["St Mary Hospital Patient Leaflet"]
+        lines += [f"Day {index + 1} of the course, paragraph {line}" for line in range(4)]
+        lines += ["Take 2 tablets with water"]
+        lines += [f"Further notes {line} for day {index + 1}" for line in range(4)]
+        lines += ["Confidential - for patient use only"]
+        pages.append({'page_number': index + 1, 'text': '\n'.join(lines)})
+    
+    filtered = list(BoilerplateFilter().filter_pages(pages))
+    
+    assert "Take 2 tablets with water" in filtered[0]['text']
+    assert sum(page['text'].count("Take 2 tablets with water") for page in filtered) == 1
+    assert all("St Mary Hospital" not in page['text'] for page in filtered)
@@ -0,0 +1,14 @@
+from utils.keyword_matcher import KeywordMatcher, MEDICAL_CONTENT_MATCHER
+
+def test_finds_overlapping_keywords_case_insensitively():
+    matcher = KeywordMatcher(['dose', 'dosage', 'age'])
+    
+    assert matcher.find_all('Check the DOSAGE') == [(10, 16, 'dosage'), (13, 16, 'age')]
+
+def test_short_thai_term_does_not_match_inside_other_words():
+    # "trying very long" contains 'ยา' (medicine) inside two unrelated words
+    assert not MEDICAL_CONTENT_MATCHER.contains_any('พยายามยาวมาก')
+
+def test_short_thai_term_matches_on_its_own():
+    assert MEDICAL_CONTENT_MATCHER.contains_any('ยา 2 เม็ด')
+    assert MEDICAL_CONTENT_MATCHER.contains_any('ไปโรงพยาบาลพรุ่งนี้')
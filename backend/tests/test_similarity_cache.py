@@ -0,0 +1,35 @@
+from utils.similarity_cache import SimilarityCache
+
+MESSAGE = "Maria, please take your blood pressure medicine every morning after breakfast with a full glass of water."
+
+def test_returns_value_for_near_duplicate():
+    cache = SimilarityCache(audit_rate=0)
+    cache.set(MESSAGE, 'general', 'adapted for Maria')
+    
+    assert cache.get(MESSAGE.replace('a full glass', 'one full glass'), 'general') == 'adapted for Maria'
+
+def test_does_not_reuse_adaptation_across_patient_names():
+    cache = SimilarityCache(audit_rate=0)
+    cache.set(MESSAGE, 'general', 'adapted for Maria')
+    
+    assert cache.get(MESSAGE.replace('Maria', 'Juana'), 'general') is None
+
+def test_does_not_reuse_adaptation_across_thai_names():
+    cache = SimilarityCache(audit_rate=0)
+    message = "คุณมาลี กรุณากินยาความดันทุกเช้าหลังอาหารเช้าพร้อมน้ำหนึ่งแก้ว"
+    cache.set(message, 'thai', 'adapted for Mali')
+    
+    assert cache.get(message, 'thai') == 'adapted for Mali'
+    assert cache.get(message.replace('มาลี', 'สมศรี'), 'thai') is None
+
+def test_does_not_reuse_adaptation_across_doses():
+    cache = SimilarityCache(audit_rate=0)
+    cache.set("Please take 2 tablets of your medicine every morning after breakfast.", 'general', 'two tablets')
+    
+    assert cache.get("Please take 20 tablets of your medicine every morning after breakfast.", 'general') is None
+
+def test_sentence_initial_capitalization_does_not_block_reuse():
+    cache = SimilarityCache(audit_rate=0)
+    cache.set("Please take your blood pressure medicine every morning after breakfast.", 'general', 'adapted')
+    
+    assert cache.get("please take your blood pressure medicine every morning after breakfast.", 'general') == 'adapted'
@@ -0,0 +1,158 @@
+"""
+Boilerplate Filter Utility for MediTalks Backend
+Strips letterheads, footers, page numbers and disclaimers repeated across PDF pages
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List
+from utils.token_estimator import estimate_tokens
+
+# Page counters leading or ending a header/footer line are masked so "Page 3 of 12" and "Page 4 of 12"
+# share a key; any other number (a dose, a date, a page reference in the text) keeps lines distinct
+_PAGE_LABEL = r'(?:\b(?:page|pg|p|trang)\.?|หน้า|ទំព័រ)\s*\d+(?:\s*(?:of|/|จาก)\s*\d+)?'
+_PAGE_NUMBER = r'\d+(?:\s*(?:of|/)\s*\d+)?'
+_SEPARATOR = r'\s*(?:[|–—•·]|\s-)\s*'
+_PAGE_COUNTER_PATTERN = re.compile(
+    rf'^[\s\-–—|.()\[\]]*(?:{_PAGE_LABEL}|{_PAGE_NUMBER})[\s\-–—|.()\[\]]*$'
+    rf'|^\s*{_PAGE_LABEL}(?!\d)'
+    rf'|^\s*{_PAGE_NUMBER}(?={_SEPARATOR})'
+    rf'|{_SEPARATOR}(?:{_PAGE_LABEL}|{_PAGE_NUMBER})\s*$',
+    re.IGNORECASE
+)
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def _mask_page_numbers(line: str) -> str:
+    """Replace a page counter ("Page 3 of 12", "- 3 -", "Leaflet | 3") at the start or end of a line"""
+    return _PAGE_COUNTER_PATTERN.sub(' # ', line, count=1)
+
+class BoilerplateFilter:
+    """
+    Streaming filter that removes lines repeated across the pages of one document
+    
+    Lines are keyed by a hash of their normalized text plus their position on
+    the page (top, bottom or body). The first `learn_pages` pages are buffered
+    to learn which keys repeat; after that pages stream straight through while
+    the counts keep updating. Top and bottom lines (letterheads, footers, page
+    numbers) only need to repeat on two pages and are removed everywhere.
+    Body lines need three, and their first occurrence is kept, so a repeated
+    instruction ("Take 2 tablets with water") or disclaimer still reaches the
+    model once.
+    
+    Use one instance per document.
+    """
+    
+    def __init__(self, learn_pages: int = 4, min_ratio: float = 0.5, edge_lines: int = 3):
+        """
+        Args:
+            learn_pages (int): Pages buffered before the first page is emitted
+            min_ratio (float): Share of pages seen so far a line must appear on
+            edge_lines (int): Lines from the top and bottom treated as header/footer positions
+        """
+        self.learn_pages = learn_pages
+        self.min_ratio = min_ratio
+        self.edge_lines = edge_lines
+        
+        self.pages_seen = 0
+        self.lines_removed = 0
+        self.chars_saved = 0
+        self.tokens_saved = 0
+        
+        self._counts = Counter()
+        self._emitted_body_keys = set()
+    
+    def filter_pages(self, pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Filter a stream of extracted pages
+        
+        Args:
+            pages: Page dicts with a raw 'text' field (newlines preserved)
+        
+        Yields:
+            Page dicts with repeated lines removed from 'text'
+        """
+        buffered = []
+        
+        for page in pages:
+            lines = page['text'].split('\n')
+            keys = self._line_keys(lines)
+            
+            self.pages_seen += 1
+            self._counts.update(set(keys))
+            
+            if self.pages_seen <= self.learn_pages:
+                buffered.append((page, lines, keys))
+                if self.pages_seen == self.learn_pages:
+                    yield from (self._strip(*entry) for entry in buffered)
+                    buffered = []
+                continue
+            
+            yield self._strip(page, lines, keys)
+        
+        yield from (self._strip(*entry) for entry in buffered)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Characters and estimated tokens saved for this document"""
+        return {
+            'pages': self.pages_seen,
+            'lines_removed': self.lines_removed,
+            'chars_saved': self.chars_saved,
+            'tokens_saved': self.tokens_saved
+        }
+    
+    def _line_keys(self, lines: List[str]) -> List[tuple]:
+        """Positional hash key for every line on a page"""
+        last = len(lines) - 1
+        keys = []
+        
+        for index, line in enumerate(lines):
+            if index < self.edge_lines:
+                position = 'top'
+            elif last - index < self.edge_lines:
+                position = 'bottom'
+            else:
+                position = 'body'
+            
+            # Only page counters are masked, and only in header/footer positions,
+            # so lines that differ by a dose or date are never merged
+            if position != 'body':
+                line = _mask_page_numbers(line)
+            normalized = _WHITESPACE_PATTERN.sub(' ', line).strip().lower()
+            
+            keys.append((position, hash(normalized)) if normalized else None)
+        
+        return keys
+    
+    def _is_boilerplate(self, key: tuple) -> bool:
+        """Whether a line key repeats often enough to be stripped"""
+        if key is None or self.pages_seen < 2:
+            return False
+        
+        count = self._counts[key]
+        min_count = 3 if key[0] == 'body' else 2
+        return count >= min_count and count / self.pages_seen >= self.min_ratio
+    
+    def _strip(self, page: Dict[str, Any], lines: List[str], keys: List[tuple]) -> Dict[str, Any]:
+        """Remove boilerplate lines from one page"""
+        kept = []
+        removed = []
+        
+        for line, key in zip(lines, keys):
+            # Repeated body text is only dropped once an earlier copy has been kept
+            if self._is_boilerplate(key) and (key[0] != 'body' or key in self._emitted_body_keys):
+                removed.append(line)
+                continue
+            
+            kept.append(line)
+            if key is not None and key[0] == 'body':
+                self._emitted_body_keys.add(key)
+        
+        if not removed:
+            return page
+        
+        removed_text = '\n'.join(removed)
+        self.lines_removed += len(removed)
+        self.chars_saved += len(removed_text)
+        self.tokens_saved += estimate_tokens(removed_text)
+        
+        return {**page, 'text': '\n'.join(kept)}
@@ -0,0 +1,209 @@
+"""
+Extraction Cache Utility for MediTalks Backend
+Content-addressed cache for PDF extraction results
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Read uploads in 1 MB blocks while hashing
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Prune the disk tier every N writes rather than on every write
+DISK_PRUNE_INTERVAL = 32
+
+def compute_content_key(file) -> str:
+    """
+    Compute the SHA-256 content key of an uploaded file
+    
+    Args:
+        file: File object positioned anywhere; it is rewound before and after hashing.
+            Objects exposing getbuffer() (BytesIO, SpooledUpload) are hashed without copying.
+    
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    
+    if hasattr(file, 'getbuffer'):
+        with file.getbuffer() as view:
+            digest.update(view)
+        file.seek(0)
+        return digest.hexdigest()
+    
+    file.seek(0)
+    
+    for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+        digest.update(block)
+    
+    file.seek(0)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """Two-tier (memory LRU + disk) cache of extraction results keyed by content hash"""
+    
+    def __init__(self, max_entries: int = 128, cache_dir: Optional[str] = None, max_disk_entries: int = 1000,
+                 version: int = 1):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.version = version
+        
+        # Entries from an older extraction pipeline live in a different directory
+        self.cache_dir = os.path.join(cache_dir, f"v{version}") if cache_dir else None
+        
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0
+        }
+        
+        if self.cache_dir and self.max_disk_entries > 0:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Extraction cache disk tier disabled: {str(e)}")
+                self.cache_dir = None
+        else:
+            self.cache_dir = None
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an extraction result
+        
+        Args:
+            key (str): Content key from compute_content_key
+        
+        Returns:
+            Cached result dict, or None on a miss
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return dict(self._entries[key])
+        
+        result = self._read_disk(key)
+        
+        with self._lock:
+            if result is None:
+                self._stats['misses'] += 1
+                return None
+            
+            self._stats['disk_hits'] += 1
+            self._store_memory(key, result)
+            return dict(result)
+    
+    def set(self, key: str, result: Dict[str, Any]):
+        """
+        Store an extraction result in both tiers
+        
+        Args:
+            key (str): Content key from compute_content_key
+            result (Dict): Successful extraction result
+        """
+        with self._lock:
+            self._store_memory(key, dict(result))
+            self._stats['stores'] += 1
+        
+        self._write_disk(key, result)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['disk_enabled'] = self.cache_dir is not None
+        stats['version'] = self.version
+        return stats
+    
+    def _store_memory(self, key: str, result: Dict[str, Any]):
+        """Insert into the memory tier, evicting least recently used entries (lock held)"""
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+    
+    def _disk_path(self, key: str) -> str:
+        """Path of a key in the disk tier, sharded by hash prefix"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+    
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read an entry from the disk tier"""
+        if not self.cache_dir:
+            return None
+        
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read extraction cache entry {key[:12]}: {str(e)}")
+            return None
+    
+    def _write_disk(self, key: str, result: Dict[str, Any]):
+        """Write an entry to the disk tier atomically"""
+        if not self.cache_dir:
+            return
+        
+        try:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write extraction cache entry {key[:12]}: {str(e)}")
+            return
+        
+        with self._lock:
+            self._disk_writes += 1
+            should_prune = self._disk_writes % DISK_PRUNE_INTERVAL == 0
+        
+        if should_prune:
+            self._prune_disk()
+    
+    def _prune_disk(self):
+        """Delete the oldest disk entries beyond max_disk_entries"""
+        try:
+            entries = []
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if name.endswith('.json'):
+                        path = os.path.join(root, name)
+                        entries.append((os.path.getmtime(path), path))
+            
+            excess = len(entries) - self.max_disk_entries
+            if excess <= 0:
+                return
+            
+            entries.sort()
+            for _, path in entries[:excess]:
+                os.remove(path)
+            
+            logger.info(f"Pruned {excess} extraction cache entries from disk")
+        
+        except OSError as e:
+            logger.warning(f"Failed to prune extraction cache: {str(e)}")
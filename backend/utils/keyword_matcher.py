@@ -0,0 +1,129 @@
+"""
+Keyword Matcher Utility for MediTalks Backend
+Aho-Corasick multi-pattern matching for medical term lookups
+"""
+
+import unicodedata
+from collections import deque
+from typing import Iterable, Iterator, List, Tuple
+from config.medical_terms import MEDICAL_KEYWORDS, KEY_POINT_KEYWORDS, MULTILINGUAL_MEDICAL_TERMS
+
+class KeywordMatcher:
+    """
+    Case-insensitive matcher that finds every keyword in one linear pass
+    
+    The Aho-Corasick automaton is compiled into a full transition table, so the
+    scan does one dict lookup per character regardless of how many keywords
+    there are. Matching is by substring, like `keyword in text`, which also
+    suits Thai and Khmer text written without spaces between words. Very short
+    non-Latin terms (Thai 'ยา') occur inside many unrelated words, so they
+    only match when no letter or combining mark adjoins them.
+    """
+    
+    # Non-Latin keywords up to this length must stand alone to match
+    MAX_BOUNDED_KEYWORD_CHARS = 2
+    
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Args:
+            keywords: Terms to match; duplicates and empty strings are ignored
+        """
+        goto = [{}]
+        outputs = [()]
+        
+        # Trie of lowercased keywords
+        self.keywords = list(dict.fromkeys(keyword.lower() for keyword in keywords if keyword))
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                if char not in goto[state]:
+                    goto[state][char] = len(goto)
+                    goto.append({})
+                    outputs.append(())
+                state = goto[state][char]
+            outputs[state] += (keyword,)
+        
+        # Breadth-first pass computing failure links and folding them into the transitions
+        transitions = [dict(goto[0])] + [None] * (len(goto) - 1)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        
+        while queue:
+            state = queue.popleft()
+            transitions[state] = {**transitions[fail[state]], **goto[state]}
+            outputs[state] += outputs[fail[state]]
+            
+            for char, child in goto[state].items():
+                fail[child] = transitions[fail[state]].get(char, 0)
+                queue.append(child)
+        
+        self._transitions = transitions
+        self._outputs = outputs
+        self._bounded = frozenset(
+            keyword for keyword in self.keywords
+            if len(keyword) <= self.MAX_BOUNDED_KEYWORD_CHARS and not keyword.isascii()
+        )
+    
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        """Letters and combining marks (Thai and Khmer vowel signs) continue a word"""
+        return unicodedata.category(char)[0] in ('L', 'M')
+    
+    def _stands_alone(self, text: str, start: int, end: int) -> bool:
+        """Whether text[start:end] has no adjoining letter or mark on either side"""
+        return not (
+            (start > 0 and self._is_word_char(text[start - 1])) or
+            (end < len(text) and self._is_word_char(text[end]))
+        )
+    
+    def _fold(self, text: str) -> str:
+        """Lowercase text while keeping character positions aligned with the input"""
+        folded = text.lower()
+        if len(folded) != len(text):
+            # A few characters (e.g. U+0130) lowercase to two code points
+            folded = ''.join(char.lower()[0] for char in text)
+        return folded
+    
+    def _scan(self, text: str) -> Iterator[Tuple[int, tuple]]:
+        """Yield (end index, keywords ending there) for every position with a match"""
+        transitions = self._transitions
+        outputs = self._outputs
+        state = 0
+        
+        bounded = self._bounded
+        
+        for index, char in enumerate(self._fold(text)):
+            state = transitions[state].get(char, 0)
+            matches = outputs[state]
+            
+            if matches and bounded:
+                matches = tuple(
+                    keyword for keyword in matches
+                    if keyword not in bounded or self._stands_alone(text, index + 1 - len(keyword), index + 1)
+                )
+            if matches:
+                yield index, matches
+    
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Find every keyword occurrence, including overlapping ones
+        
+        Args:
+            text (str): Text to search
+        
+        Returns:
+            List of (start, end, keyword) tuples ordered by end position
+        """
+        return [
+            (end + 1 - len(keyword), end + 1, keyword)
+            for end, keywords in self._scan(text)
+            for keyword in keywords
+        ]
+    
+    def contains_any(self, text: str) -> bool:
+        """Whether any keyword occurs in text, stopping at the first match"""
+        return next(self._scan(text), None) is not None
+
+# Built once at import and shared by the validation and summarization services
+MEDICAL_CONTENT_MATCHER = KeywordMatcher(MEDICAL_KEYWORDS + MULTILINGUAL_MEDICAL_TERMS)
+KEY_POINT_MATCHER = KeywordMatcher(KEY_POINT_KEYWORDS + MULTILINGUAL_MEDICAL_TERMS)
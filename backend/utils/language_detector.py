@@ -0,0 +1,126 @@
+"""
+Language Detector Utility for MediTalks Backend
+Script-based language detection with langdetect as a fallback for ambiguous Latin text
+"""
+
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any
+from langdetect import detect, DetectorFactory
+
+# Set seed for consistent language detection
+DetectorFactory.seed = 0
+
+logger = logging.getLogger(__name__)
+
+# Codepoint ranges per script; each pattern is a single C-level scan over the sample
+_SCRIPT_PATTERNS = {
+    'thai': re.compile(r'[\u0e01-\u0e5b]'),
+    'khmer': re.compile(r'[\u1780-\u17f9\u19e0-\u19ff]'),
+    'latin': re.compile(r'[A-Za-z\u00c0-\u024f\u1e00-\u1eff]')
+}
+
+# Letters only used by Vietnamese among the Latin-script languages we serve
+_VIETNAMESE_PATTERN = re.compile(r'[\u0102\u0103\u0110\u0111\u01a0\u01a1\u01af\u01b0\u1ea0-\u1ef9]')
+
+# Any letter in any script
+_LETTER_PATTERN = re.compile(r'[^\W\d_]')
+
+# Thai and Khmer vowel signs are combining marks, not \w letters
+_SEA_MARK_PATTERN = re.compile(r'[\u0e31\u0e34-\u0e3a\u0e47-\u0e4e\u17b4-\u17d3]')
+
+# Share of letters a script must reach to settle the language without langdetect
+SCRIPT_DOMINANCE_RATIO = 0.5
+
+# Share of Latin letters that must be Vietnamese-specific to classify as Vietnamese
+VIETNAMESE_LETTER_RATIO = 0.02
+
+class LanguageDetector:
+    """Classifies text by Unicode script, using langdetect only for ambiguous Latin text"""
+    
+    def __init__(self, sample_chars: int = 1000, max_cache_entries: int = 1024):
+        self.sample_chars = sample_chars
+        self.max_cache_entries = max_cache_entries
+        
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'cache_hits': 0,
+            'script_decisions': 0,
+            'langdetect_fallbacks': 0
+        }
+    
+    def detect(self, text: str) -> str:
+        """
+        Detect the language of text
+        
+        Args:
+            text (str): Text to classify; only the leading sample is inspected
+        
+        Returns:
+            str: ISO 639-1 language code, or 'unknown'
+        """
+        sample = text[:self.sample_chars]
+        key = hashlib.sha1(sample.encode('utf-8', 'surrogatepass')).hexdigest()
+        
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._stats['cache_hits'] += 1
+                return self._cache[key]
+        
+        language = self._detect_uncached(sample)
+        
+        with self._lock:
+            self._cache[key] = language
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+        
+        return language
+    
+    def _detect_uncached(self, sample: str) -> str:
+        """Classify a sample by script histogram, then by langdetect if still ambiguous"""
+        histogram = self.script_histogram(sample)
+        letters = histogram['letters']
+        
+        if letters == 0:
+            return 'unknown'
+        
+        for script, language in (('thai', 'th'), ('khmer', 'km')):
+            if histogram[script] / letters >= SCRIPT_DOMINANCE_RATIO:
+                self._count('script_decisions')
+                return language
+        
+        latin = histogram['latin']
+        if latin / letters >= SCRIPT_DOMINANCE_RATIO and histogram['vietnamese'] / latin >= VIETNAMESE_LETTER_RATIO:
+            self._count('script_decisions')
+            return 'vi'
+        
+        # Ambiguous Latin (English, Malay, Tagalog, ...) or another script
+        self._count('langdetect_fallbacks')
+        try:
+            return detect(sample)
+        except Exception as e:
+            logger.warning(f"Language detection failed: {str(e)}")
+            return 'unknown'
+    
+    def script_histogram(self, sample: str) -> Dict[str, int]:
+        """Count letters per script in a sample"""
+        histogram = {script: len(pattern.findall(sample)) for script, pattern in _SCRIPT_PATTERNS.items()}
+        histogram['vietnamese'] = len(_VIETNAMESE_PATTERN.findall(sample))
+        histogram['letters'] = len(_LETTER_PATTERN.findall(sample)) + len(_SEA_MARK_PATTERN.findall(sample))
+        return histogram
+    
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache and decision counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cache_entries'] = len(self._cache)
+        return stats
@@ -0,0 +1,225 @@
+"""
+LLM Usage Utility for MediTalks Backend
+Per-request token and latency accounting for provider calls, aggregated per endpoint and per cultural context
+"""
+
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+from utils.token_estimator import estimate_tokens
+
+# Attribution of the current request or job; copied into worker threads and provider tasks
+_current_endpoint = contextvars.ContextVar('llm_usage_endpoint', default=None)
+_current_context = contextvars.ContextVar('llm_usage_context', default=None)
+
+UNATTRIBUTED = 'unattributed'
+
+def _new_bucket() -> Dict[str, Any]:
+    return {
+        'requests': 0,
+        'request_seconds': 0.0,
+        'llm_calls': 0,
+        'failed_calls': 0,
+        'cache_hits': 0,
+        'prompt_tokens': 0,
+        'response_tokens': 0,
+        'llm_seconds': 0.0,
+        'providers': {}
+    }
+
+def _summarize(bucket: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a bucket with rounded totals and per-request and per-call means"""
+    summary = dict(bucket)
+    summary['providers'] = {name: dict(provider) for name, provider in bucket['providers'].items()}
+    
+    requests, calls = summary['requests'], summary['llm_calls']
+    summary['mean_request_seconds'] = round(summary['request_seconds'] / requests, 4) if requests else None
+    summary['mean_llm_seconds'] = round(summary['llm_seconds'] / calls, 4) if calls else None
+    summary['tokens_per_request'] = (
+        round((summary['prompt_tokens'] + summary['response_tokens']) / requests, 1) if requests else None
+    )
+    summary['request_seconds'] = round(summary['request_seconds'], 4)
+    summary['llm_seconds'] = round(summary['llm_seconds'], 4)
+    
+    for provider in summary['providers'].values():
+        provider['llm_seconds'] = round(provider['llm_seconds'], 4)
+    return summary
+
+class UsageTracker:
+    """
+    Thread-safe token and latency totals per endpoint and per cultural context
+    
+    Requests are attributed through context variables, so provider calls made
+    from worker threads or the provider event loop are charged to the request
+    that caused them as long as the context is carried across (see
+    attribution() and wrap()).
+    """
+    
+    def __init__(self):
+        self._endpoints = {}
+        self._contexts = {}
+        self._lock = threading.Lock()
+    
+    def start_request(self, endpoint: str, context: Optional[str] = None) -> Tuple[Any, Any, float]:
+        """
+        Attribute calls on this thread to endpoint and context until finish_request
+        
+        Returns:
+            Handle to pass to finish_request
+        """
+        previous = (_current_endpoint.get(), _current_context.get())
+        _current_endpoint.set(endpoint)
+        _current_context.set(context)
+        return previous, (endpoint, context), time.perf_counter()
+    
+    def finish_request(self, handle: Tuple[Any, Any, float]):
+        """Count the request and its wall time, then restore the previous attribution"""
+        previous, (endpoint, context), started = handle
+        elapsed = time.perf_counter() - started
+        
+        # The context may have been narrowed by set_context during the request
+        context = _current_context.get() or context
+        
+        with self._lock:
+            for bucket in self._buckets(endpoint, context):
+                bucket['requests'] += 1
+                bucket['request_seconds'] += elapsed
+        
+        _current_endpoint.set(previous[0])
+        _current_context.set(previous[1])
+    
+    @contextmanager
+    def request(self, endpoint: str, context: Optional[str] = None):
+        """Context manager form of start_request/finish_request, e.g. for background jobs"""
+        handle = self.start_request(endpoint, context)
+        try:
+            yield
+        finally:
+            self.finish_request(handle)
+    
+    def set_context(self, context: Optional[str]):
+        """Attribute further calls in the current context to a cultural context"""
+        _current_context.set(context)
+    
+    @staticmethod
+    def attribution() -> Tuple[Optional[str], Optional[str]]:
+        """Current (endpoint, context), for carrying attribution into another thread or task"""
+        return _current_endpoint.get(), _current_context.get()
+    
+    @staticmethod
+    def restore(attribution: Tuple[Optional[str], Optional[str]]):
+        """Apply an attribution captured with attribution() in the current context"""
+        _current_endpoint.set(attribution[0])
+        _current_context.set(attribution[1])
+    
+    @staticmethod
+    def wrap(fn):
+        """Bind fn to a copy of the current context so executor threads keep the attribution"""
+        context = contextvars.copy_context()
+        return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+    
+    def _buckets(self, endpoint: Optional[str], context: Optional[str]):
+        """Endpoint and context buckets for an attribution (lock held)"""
+        endpoint_bucket = self._endpoints.get(endpoint or UNATTRIBUTED)
+        if endpoint_bucket is None:
+            endpoint_bucket = self._endpoints[endpoint or UNATTRIBUTED] = _new_bucket()
+        
+        if not context:
+            return (endpoint_bucket,)
+        
+        context_bucket = self._contexts.get(context)
+        if context_bucket is None:
+            context_bucket = self._contexts[context] = _new_bucket()
+        return endpoint_bucket, context_bucket
+    
+    def record(self, provider: str, model: str, prompt_tokens: int, response_tokens: int,
+               latency_seconds: float, cache_status: str = 'miss', failed: bool = False):
+        """
+        Record one provider call (or cache hit standing in for one) against the current attribution
+        
+        Args:
+            provider (str): 'gemini', 'sealion' or the cache that answered
+            model (str): Model name
+            prompt_tokens (int): Prompt tokens, reported or estimated
+            response_tokens (int): Response tokens, reported or estimated
+            latency_seconds (float): Time the call took
+            cache_status (str): 'miss' for real calls, or the cache that served the response
+            failed (bool): Whether the call raised
+        """
+        endpoint, context = self.attribution()
+        cached = cache_status != 'miss'
+        provider_key = f"{provider}/{model}" if model else provider
+        
+        with self._lock:
+            for bucket in self._buckets(endpoint, context):
+                if cached:
+                    bucket['cache_hits'] += 1
+                else:
+                    bucket['llm_calls'] += 1
+                    bucket['failed_calls'] += failed
+                    bucket['prompt_tokens'] += prompt_tokens
+                    bucket['response_tokens'] += response_tokens
+                    bucket['llm_seconds'] += latency_seconds
+                
+                provider_stats = bucket['providers'].setdefault(provider_key, {
+                    'calls': 0,
+                    'cache_hits': 0,
+                    'prompt_tokens': 0,
+                    'response_tokens': 0,
+                    'llm_seconds': 0.0
+                })
+                if cached:
+                    provider_stats['cache_hits'] += 1
+                else:
+                    provider_stats['calls'] += 1
+                    provider_stats['prompt_tokens'] += prompt_tokens
+                    provider_stats['response_tokens'] += response_tokens
+                    provider_stats['llm_seconds'] += latency_seconds
+    
+    def track_stream(self, provider: str, model: str, prompt: str, tokens: Iterator[str]) -> Iterator[str]:
+        """Pass a streamed response through, recording estimated tokens and total stream time"""
+        started = time.perf_counter()
+        parts = []
+        failed = True
+        try:
+            for token in tokens:
+                parts.append(token)
+                yield token
+            failed = False
+        finally:
+            self.record(provider, model, estimate_tokens(prompt), estimate_tokens(''.join(parts)),
+                        time.perf_counter() - started, failed=failed)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get totals per endpoint and per cultural context"""
+        with self._lock:
+            return {
+                'endpoints': {name: _summarize(bucket) for name, bucket in self._endpoints.items()},
+                'contexts': {name: _summarize(bucket) for name, bucket in self._contexts.items()}
+            }
+
+usage_tracker = UsageTracker()
+
+def response_token_counts(prompt: str, text: Optional[str], raw: Any) -> Tuple[int, int]:
+    """
+    Prompt and response tokens reported by the provider, estimated locally when missing
+    
+    Args:
+        prompt (str): Prompt sent
+        text (str): Response text
+        raw: Gemini response (usage_metadata) or SEA-Lion JSON body ('usage')
+    
+    Returns:
+        tuple: (prompt_tokens, response_tokens)
+    """
+    usage_metadata = getattr(raw, 'usage_metadata', None)
+    if usage_metadata is not None and getattr(usage_metadata, 'prompt_token_count', None):
+        return usage_metadata.prompt_token_count, getattr(usage_metadata, 'candidates_token_count', 0) or 0
+    
+    usage = raw.get('usage') if isinstance(raw, dict) else None
+    if usage and usage.get('prompt_tokens'):
+        return usage['prompt_tokens'], usage.get('completion_tokens') or 0
+    
+    return estimate_tokens(prompt), estimate_tokens(text or '')
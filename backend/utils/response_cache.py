@@ -0,0 +1,137 @@
+"""
+Response Cache Utility for MediTalks Backend
+Caches Gemini responses by model, generation config and normalized prompt
+"""
+
+import os
+import re
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict, namedtuple
+from typing import Any, Dict, Optional
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Stand-in for a Gemini response served from the cache; callers only read .text
+CachedResponse = namedtuple('CachedResponse', ['text'])
+
+class ResponseCache:
+    """Thread-safe LRU cache of LLM response texts bounded by entry count, bytes and age"""
+    
+    def __init__(self, max_entries: int = 512, max_bytes: int = 16 * 1024 * 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        
+        # key -> (expires_at, text, size)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0 and self.ttl_seconds > 0
+    
+    @staticmethod
+    def make_key(model_name: str, generation_config: Any, prompt: str) -> str:
+        """
+        Build a cache key from everything that determines a response
+        
+        Prompts are NFC-normalized and whitespace-collapsed first, so prompts
+        that differ only in indentation or line breaks share an entry.
+        
+        Args:
+            model_name (str): Model identifier
+            generation_config: Generation settings (anything with a stable repr)
+            prompt (str): Prompt text
+        
+        Returns:
+            str: Hex digest
+        """
+        normalized = _WHITESPACE_PATTERN.sub(' ', unicodedata.normalize('NFC', prompt)).strip()
+        digest = hashlib.sha256()
+        for part in (model_name, repr(generation_config), normalized):
+            digest.update(part.encode('utf-8', 'surrogatepass'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+    
+    def set(self, key: str, text: str):
+        """Store a response text, evicting least recently used entries past the bounds"""
+        size = len(key) + len(text.encode('utf-8', 'surrogatepass'))
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, text, size)
+            self._bytes += size
+            self._stats['stores'] += 1
+            
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+    
+    def _remove(self, key: str):
+        """Drop an entry and its byte count (lock held)"""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['max_bytes'] = self.max_bytes
+        stats['ttl_seconds'] = self.ttl_seconds
+        return stats
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache, created on first use so .env settings are loaded"""
+    global _response_cache
+    
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '512')),
+                max_bytes=int(os.getenv('LLM_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+                ttl_seconds=float(os.getenv('LLM_CACHE_TTL_SECONDS', '3600'))
+            )
+        return _response_cache
@@ -0,0 +1,276 @@
+"""
+Similarity Cache Utility for MediTalks Backend
+Near-duplicate message cache using MinHash signatures and locality-sensitive hashing
+"""
+
+import re
+import random
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict, namedtuple
+from typing import Any, Dict, List, Optional, Tuple
+
+# Punctuation and symbols are dropped before shingling; letters, digits and Thai/Khmer vowel marks stay
+_NON_WORD_PATTERN = re.compile(r'[^\w\u0e31\u0e34-\u0e3a\u0e47-\u0e4e\u17b4-\u17d3]+')
+_NUMBER_PATTERN = re.compile(r'\d+(?:[.,]\d+)?')
+
+# Capitalized words (names, places, drug brands) and words after Thai/Khmer honorifics, which have no case
+_WORD_PATTERN = re.compile(r"[^\W\d_][\w'’-]*")
+_SENTENCE_SPLIT_PATTERN = re.compile(r'(?<=[.!?])\s+|\n+')
+_HONORIFIC_NAME_PATTERN = re.compile(r'(?:คุณ|លោកស្រី|អ្នកស្រី|លោក)\s*([^\s.,!?;:()]+)')
+
+# Mersenne prime for the universal hash family a * x + b mod p
+_MERSENNE_PRIME = (1 << 61) - 1
+
+_Entry = namedtuple('_Entry', ['signature', 'shingles', 'numbers', 'names', 'value'])
+
+class SimilarityCache:
+    """
+    Per-context cache that returns stored values for near-duplicate messages
+    
+    Messages are normalized, split into character shingles (which works for
+    Thai and Khmer text without word spaces) and summarized by a MinHash
+    signature. Signatures are split into LSH bands so a lookup only compares
+    against entries sharing at least one band. A hit needs an estimated
+    Jaccard similarity at or above the threshold and exactly the same numbers
+    and names as the stored message, so "take 2 tablets" never matches "take
+    20 tablets" and a message addressed to Juana never returns Maria's.
+    
+    A sampled fraction of lookups is audited against every stored entry with
+    exact Jaccard similarity to count true positives, false positives and
+    false negatives, giving precision and recall for threshold tuning.
+    """
+    
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, bands: int = 16, shingle_size: int = 4,
+                 max_entries_per_context: int = 256, audit_rate: float = 0.05, seed: int = 1):
+        """
+        Args:
+            threshold (float): Minimum Jaccard similarity for a hit
+            num_perm (int): MinHash signature length
+            bands (int): LSH bands; num_perm must be divisible by it
+            shingle_size (int): Characters per shingle
+            max_entries_per_context (int): LRU bound per context
+            audit_rate (float): Fraction of lookups checked exhaustively for precision/recall
+            seed (int): Seed for the hash permutations
+        """
+        if num_perm % bands:
+            raise ValueError('num_perm must be divisible by bands')
+        
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_entries_per_context = max_entries_per_context
+        self.audit_rate = audit_rate
+        
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+        self._random = random.Random()
+        
+        # context -> OrderedDict(entry_id -> _Entry) and context -> {(band, band_hash): {entry_id}}
+        self._entries = {}
+        self._buckets = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'candidates_compared': 0,
+            'audited_lookups': 0,
+            'true_positives': 0,
+            'false_positives': 0,
+            'false_negatives': 0
+        }
+    
+    def _normalize(self, message: str) -> str:
+        """Case-fold, compose accents and reduce punctuation and whitespace to single spaces"""
+        message = unicodedata.normalize('NFC', message).casefold()
+        return _NON_WORD_PATTERN.sub(' ', message).strip()
+    
+    def _shingles(self, normalized: str) -> frozenset:
+        """64-bit hashes of overlapping character shingles"""
+        size = self.shingle_size
+        if len(normalized) <= size:
+            pieces = [normalized]
+        else:
+            pieces = [normalized[i:i + size] for i in range(len(normalized) - size + 1)]
+        
+        return frozenset(
+            int.from_bytes(hashlib.blake2b(piece.encode('utf-8'), digest_size=8).digest(), 'big')
+            for piece in pieces
+        )
+    
+    def _signature(self, shingles: frozenset) -> Tuple[int, ...]:
+        """MinHash signature: the minimum of each permuted hash over all shingles"""
+        return tuple(
+            min((a * x + b) % _MERSENNE_PRIME for x in shingles)
+            for a, b in self._permutations
+        )
+    
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[tuple]:
+        """LSH bucket keys, one per band"""
+        rows = self.rows
+        return [(band, hash(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+    
+    def _names(self, message: str) -> tuple:
+        """
+        Possible names, which must match exactly for a hit
+        
+        Capitalized words inside a sentence are kept as written. The first word
+        of a sentence is capitalized either way, so it is compared case-folded:
+        "Please take" and "please take" share names, "Maria, please" and
+        "Juana, please" do not. Names after Thai/Khmer honorifics are added too.
+        """
+        message = unicodedata.normalize('NFC', message)
+        names = []
+        
+        for sentence in _SENTENCE_SPLIT_PATTERN.split(message):
+            words = _WORD_PATTERN.findall(sentence)
+            if words:
+                names.append(words[0].casefold())
+                names.extend(word for word in words[1:] if word[0].isupper())
+        
+        names.extend(_HONORIFIC_NAME_PATTERN.findall(message))
+        return tuple(names)
+    
+    def _fingerprint(self, message: str) -> Optional[tuple]:
+        """Shingles, signature, numbers and names of a message, or None if it has no content"""
+        normalized = self._normalize(message)
+        if not normalized:
+            return None
+        
+        shingles = self._shingles(normalized)
+        return shingles, self._signature(shingles), tuple(_NUMBER_PATTERN.findall(normalized)), self._names(message)
+    
+    def get(self, message: str, context: str) -> Optional[Any]:
+        """
+        Look up the value stored for a near-duplicate of message
+        
+        Args:
+            message (str): Incoming message
+            context (str): Cultural context; entries are never shared across contexts
+        
+        Returns:
+            Stored value of the most similar qualifying entry, or None
+        """
+        fingerprint = self._fingerprint(message)
+        if fingerprint is None:
+            return None
+        
+        shingles, signature, numbers, names = fingerprint
+        
+        with self._lock:
+            entries = self._entries.get(context)
+            if not entries:
+                self._stats['misses'] += 1
+                return None
+            
+            buckets = self._buckets[context]
+            candidates = set()
+            for band_key in self._band_keys(signature):
+                candidates.update(buckets.get(band_key, ()))
+            
+            best_id = None
+            best_similarity = 0.0
+            for entry_id in candidates:
+                entry = entries[entry_id]
+                if entry.numbers != numbers or entry.names != names:
+                    continue
+                
+                similarity = sum(1 for x, y in zip(signature, entry.signature) if x == y) / self.num_perm
+                if similarity >= self.threshold and similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            
+            self._stats['candidates_compared'] += len(candidates)
+            
+            if self.audit_rate > 0 and self._random.random() < self.audit_rate:
+                self._audit(entries, shingles, numbers, names, best_id)
+            
+            if best_id is None:
+                self._stats['misses'] += 1
+                return None
+            
+            entries.move_to_end(best_id)
+            self._stats['hits'] += 1
+            return entries[best_id].value
+    
+    def set(self, message: str, context: str, value: Any):
+        """
+        Store a value for message under context
+        
+        Args:
+            message (str): Message the value was generated for
+            context (str): Cultural context
+            value: Value to return for near-duplicates
+        """
+        fingerprint = self._fingerprint(message)
+        if fingerprint is None:
+            return
+        
+        shingles, signature, numbers, names = fingerprint
+        
+        with self._lock:
+            entries = self._entries.setdefault(context, OrderedDict())
+            buckets = self._buckets.setdefault(context, {})
+            
+            entry_id = self._next_id
+            self._next_id += 1
+            
+            entries[entry_id] = _Entry(signature, shingles, numbers, names, value)
+            for band_key in self._band_keys(signature):
+                buckets.setdefault(band_key, set()).add(entry_id)
+            self._stats['stores'] += 1
+            
+            while len(entries) > self.max_entries_per_context:
+                evicted_id, evicted = entries.popitem(last=False)
+                for band_key in self._band_keys(evicted.signature):
+                    bucket = buckets.get(band_key)
+                    if bucket is not None:
+                        bucket.discard(evicted_id)
+                        if not bucket:
+                            del buckets[band_key]
+                self._stats['evictions'] += 1
+    
+    def _audit(self, entries: OrderedDict, shingles: frozenset, numbers: tuple, names: tuple, hit_id: Optional[int]):
+        """Compare a lookup against every entry with exact Jaccard similarity (lock held)"""
+        def jaccard(other: frozenset) -> float:
+            return len(shingles & other) / len(shingles | other)
+        
+        self._stats['audited_lookups'] += 1
+        
+        if hit_id is not None:
+            if jaccard(entries[hit_id].shingles) >= self.threshold:
+                self._stats['true_positives'] += 1
+            else:
+                self._stats['false_positives'] += 1
+            return
+        
+        if any(
+            entry.numbers == numbers and entry.names == names and jaccard(entry.shingles) >= self.threshold
+            for entry in entries.values()
+        ):
+            self._stats['false_negatives'] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters, audit-based precision and recall, and sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['contexts'] = len(self._entries)
+            stats['entries'] = sum(len(entries) for entries in self._entries.values())
+        
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        
+        true_positives = stats['true_positives']
+        judged_hits = true_positives + stats['false_positives']
+        actual_duplicates = true_positives + stats['false_negatives']
+        stats['precision'] = round(true_positives / judged_hits, 4) if judged_hits else None
+        stats['recall'] = round(true_positives / actual_duplicates, 4) if actual_duplicates else None
+        stats['threshold'] = self.threshold
+        return stats
@@ -0,0 +1,87 @@
+"""
+Single Flight Utility for MediTalks Backend
+Coalesces concurrent identical calls so only one reaches the upstream service
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+class _Call:
+    """One in-flight call and the outcome its waiters share"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Thread-level request coalescing
+    
+    The first caller for a key runs the function; callers arriving with the
+    same key while it is running block until it finishes and receive the same
+    result (or the same exception). Nothing is cached after the call returns.
+    """
+    
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'executions': 0,
+            'collapsed': 0,
+            'errors': 0
+        }
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once per key among concurrent callers
+        
+        Args:
+            key: Identity of the call, e.g. (message, context, provider)
+            fn: Zero-argument callable performing the call
+        
+        Returns:
+            tuple: (result, shared) where shared is True if another caller's result was reused
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            
+            if call is not None:
+                self._stats['collapsed'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats['executions'] += 1
+                leader = True
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        
+        return call.result, False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get call counters and the number of keys currently in flight"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        
+        stats['collapse_rate'] = round(stats['collapsed'] / stats['calls'], 4) if stats['calls'] else 0.0
+        return stats
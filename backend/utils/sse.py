@@ -0,0 +1,26 @@
+"""
+Server-Sent Events Utility for MediTalks Backend
+Formats streaming responses for EventSource clients
+"""
+
+import json
+from typing import Any, Dict
+
+# Disable proxy buffering so each event reaches the client as soon as it is written
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """
+    Format a single Server-Sent Event
+    
+    Args:
+        event (str): Event name
+        data (Dict): JSON-serializable payload
+    
+    Returns:
+        str: Event frame terminated by a blank line
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
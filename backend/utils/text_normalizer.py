@@ -0,0 +1,81 @@
+"""
+Text Normalizer Utility for MediTalks Backend
+Fast normalization of text extracted from PDF documents
+"""
+
+import re
+import unicodedata
+
+# Characters removed outright: controls, soft hyphens and invisible joiners/markers
+_DELETED_CHARS = (
+    [chr(cp) for cp in range(0x00, 0x20) if chr(cp) not in '\t\n\r\x0b\x0c\x1c\x1d\x1e\x1f']
+    + [chr(cp) for cp in range(0x7F, 0xA0) if chr(cp) != '\x85']
+    + ['\u00ad', '\u200b', '\u2060', '\ufeff']  # soft hyphen, zero-width space, word joiner, BOM
+)
+
+# Typographic ligatures emitted by PDF fonts
+_LIGATURES = {
+    '\ufb00': 'ff',
+    '\ufb01': 'fi',
+    '\ufb02': 'fl',
+    '\ufb03': 'ffi',
+    '\ufb04': 'ffl',
+    '\ufb05': 'st',
+    '\ufb06': 'st'
+}
+
+# Precomputed replacement table for artifact characters
+NORMALIZATION_TABLE = {
+    **{char: '' for char in _DELETED_CHARS},
+    **_LIGATURES
+}
+
+# Layout glyphs treated like whitespace: bullets, box drawing, geometric shapes,
+# dingbats, private-use glyphs and the replacement character
+_SPACE_LIKE = r'\u00b7\u2022\u2023\u2043\u204c\u204d\u2219\u2500-\u25ff\u2700-\u27bf\ue000-\uf8ff\ufffd\U000f0000-\U0010fffd'
+
+_ARTIFACT_PATTERN = re.compile('[' + ''.join(re.escape(char) for char in NORMALIZATION_TABLE) + ']')
+
+# Only runs that actually change are matched: single plain spaces are left alone
+_COLLAPSE_PATTERN = re.compile(
+    rf'[^\S ][\s{_SPACE_LIKE}]*|[{_SPACE_LIKE}][\s{_SPACE_LIKE}]*| [\s{_SPACE_LIKE}]+'
+)
+
+# Same as above, also swallowing pdfminer (cid:NN) placeholders for unmapped glyphs
+_COLLAPSE_WITH_CID_PATTERN = re.compile(
+    rf'(?:[^\S ]|[{_SPACE_LIKE}]|\(cid:\d+\))(?:[\s{_SPACE_LIKE}]|\(cid:\d+\))*'
+    rf'| (?:[\s{_SPACE_LIKE}]|\(cid:\d+\))+'
+)
+
+def _replace_artifact(match) -> str:
+    return NORMALIZATION_TABLE[match.group()]
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize extracted PDF text in one scan per concern, all with precompiled patterns
+    
+    Unlike a `[^\\w...]` whitelist, this keeps every letter, digit, combining mark
+    and symbol, so Thai and Khmer vowel signs, Vietnamese tone marks and dosage
+    symbols such as % and ° survive. Only PDF artifacts are removed.
+    
+    The artifact table is applied through a compiled character-class scan rather
+    than str.translate, which falls back to a per-character lookup on non-Latin-1
+    text and is several times slower on Thai or Khmer documents.
+    
+    Args:
+        text (str): Raw extracted text
+    
+    Returns:
+        str: NFC-normalized text with whitespace collapsed to single spaces
+    """
+    if not text:
+        return ""
+    
+    text = _ARTIFACT_PATTERN.sub(_replace_artifact, text)
+    
+    # Compose decomposed accents; most text is already NFC and takes the fast path
+    if not unicodedata.is_normalized('NFC', text):
+        text = unicodedata.normalize('NFC', text)
+    
+    collapse_pattern = _COLLAPSE_WITH_CID_PATTERN if '(cid:' in text else _COLLAPSE_PATTERN
+    return collapse_pattern.sub(' ', text).strip()
@@ -0,0 +1,45 @@
+"""
+Token Estimator Utility for MediTalks Backend
+Cheap, tokenizer-free token estimates for LLM prompt budgeting
+"""
+
+# Average UTF-8 bytes per token. Roughly 4 characters per token for English and
+# close to one token per character for Thai and Khmer, which use 3 bytes each.
+BYTES_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of LLM tokens in text
+    
+    Args:
+        text (str): Text to measure
+    
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    return max(1, len(text.encode('utf-8', 'surrogatepass')) // BYTES_PER_TOKEN)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Truncate text to approximately max_tokens, preferring a word boundary
+    
+    Args:
+        text (str): Text to truncate
+        max_tokens (int): Token budget
+    
+    Returns:
+        str: Text that fits the budget
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    max_bytes = max_tokens * BYTES_PER_TOKEN
+    truncated = text.encode('utf-8', 'surrogatepass')[:max_bytes].decode('utf-8', 'ignore')
+    
+    boundary = truncated.rfind(' ')
+    if boundary > len(truncated) * 0.8:
+        truncated = truncated[:boundary]
+    
+    return truncated
@@ -0,0 +1,117 @@
+"""
+Upload Spool Utility for MediTalks Backend
+Buffers uploaded files in memory up to a threshold, then spools them to disk
+"""
+
+import io
+import mmap
+import logging
+import tempfile
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Copy uploads in 1 MB blocks so large files never sit in RAM at once
+COPY_BLOCK_SIZE = 1024 * 1024
+
+class SpooledUpload:
+    """
+    Read-only, seekable view of an uploaded file
+    
+    Small uploads stay in a BytesIO. Once an upload grows past the threshold it
+    is written to a named temporary file and memory-mapped, so its pages live in
+    the shared page cache instead of the worker's heap. Readers (pdfplumber,
+    PyPDF2, hashlib) consume the upload through read/seek/tell or getbuffer()
+    without an extra full-size copy.
+    """
+    
+    def __init__(self, source, threshold: int = 2 * 1024 * 1024):
+        self.threshold = threshold
+        self.size = 0
+        self.path: Optional[str] = None
+        
+        self._temp_file = None
+        self._mmap = None
+        self._buffer = io.BytesIO()
+        
+        try:
+            self._copy(source)
+        except Exception:
+            self.close()
+            raise
+    
+    def _copy(self, source):
+        """Copy the source stream, rolling over to disk past the threshold"""
+        sink = self._buffer
+        
+        for block in iter(lambda: source.read(COPY_BLOCK_SIZE), b''):
+            self.size += len(block)
+            
+            if self._temp_file is None and self.size > self.threshold:
+                self._temp_file = tempfile.NamedTemporaryFile(prefix='meditalks-upload-', suffix='.pdf')
+                self._temp_file.write(self._buffer.getbuffer())
+                self._buffer = None
+                sink = self._temp_file
+                logger.info(f"Upload exceeded {self.threshold} bytes, spooling to {self._temp_file.name}")
+            
+            sink.write(block)
+        
+        if self._temp_file is None:
+            self._buffer.seek(0)
+            return
+        
+        self._temp_file.flush()
+        self.path = self._temp_file.name
+        self._mmap = mmap.mmap(self._temp_file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    @property
+    def spooled(self) -> bool:
+        """Whether the upload was spooled to disk"""
+        return self._mmap is not None
+    
+    def _stream(self):
+        """Underlying seekable stream"""
+        if self._mmap is not None:
+            return self._mmap
+        return self._buffer
+    
+    def read(self, size: int = -1) -> bytes:
+        return self._stream().read(size)
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._stream().seek(offset, whence)
+        return self._stream().tell()
+    
+    def tell(self) -> int:
+        return self._stream().tell()
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def readable(self) -> bool:
+        return True
+    
+    def getbuffer(self) -> memoryview:
+        """Zero-copy view of the whole upload (release it before closing)"""
+        if self._mmap is not None:
+            return memoryview(self._mmap)
+        return self._buffer.getbuffer()
+    
+    def close(self):
+        """Release the memory map and delete the spool file"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        
+        if self._temp_file is not None:
+            self._temp_file.close()
+            self._temp_file = None
+        
+        self._buffer = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
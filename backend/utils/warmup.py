@@ -0,0 +1,106 @@
+"""
+Warm-up Utility for MediTalks Backend
+Runs slow service initialization (network probes, model selection) in the background after startup
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Warm-up task states
+WARMUP_PENDING = 'pending'
+WARMUP_RUNNING = 'running'
+WARMUP_READY = 'ready'
+WARMUP_FAILED = 'failed'
+WARMUP_SKIPPED = 'skipped'
+
+class WarmupManager:
+    """
+    Background warm-up tasks with per-task state for health reporting
+    
+    Services construct without touching the network; their probes are
+    registered here and run on daemon threads once start() is called, so a
+    worker accepts traffic immediately and requests arriving before a probe
+    finishes simply use the service's defaults or fallbacks.
+    """
+    
+    def __init__(self):
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._started = False
+    
+    def register(self, name: str, task: Callable[[], Any]):
+        """
+        Add a warm-up task
+        
+        Args:
+            name (str): Task name reported by get_status()
+            task: Zero-argument callable; a falsy result or an exception marks the task failed
+        """
+        with self._lock:
+            self._tasks[name] = {
+                'task': task,
+                'state': WARMUP_PENDING,
+                'seconds': None,
+                'error': None
+            }
+    
+    def start(self, enabled: bool = True):
+        """
+        Run every registered task on its own daemon thread (idempotent)
+        
+        Args:
+            enabled (bool): If False, tasks are marked skipped instead of run
+        """
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            
+            for name, entry in self._tasks.items():
+                if not enabled:
+                    entry['state'] = WARMUP_SKIPPED
+                    continue
+                
+                threading.Thread(target=self._run, args=(name,), name=f"warmup-{name}", daemon=True).start()
+    
+    def _run(self, name: str):
+        with self._lock:
+            entry = self._tasks[name]
+            entry['state'] = WARMUP_RUNNING
+        
+        started = time.monotonic()
+        error = None
+        try:
+            ok = bool(entry['task']())
+        except Exception as e:
+            ok = False
+            error = str(e)
+        
+        with self._lock:
+            entry['state'] = WARMUP_READY if ok else WARMUP_FAILED
+            entry['seconds'] = round(time.monotonic() - started, 3)
+            entry['error'] = error
+        
+        if ok:
+            logger.info(f"Warm-up '{name}' finished in {entry['seconds']}s")
+        else:
+            logger.warning(f"Warm-up '{name}' failed after {entry['seconds']}s: {error or 'probe returned no result'}")
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Get each task's state and whether warm-up has finished"""
+        with self._lock:
+            tasks = {
+                name: {key: value for key, value in entry.items() if key != 'task'}
+                for name, entry in self._tasks.items()
+            }
+        
+        finished = all(task['state'] not in (WARMUP_PENDING, WARMUP_RUNNING) for task in tasks.values())
+        return {
+            'complete': self._started and finished,
+            'ready': self._started and all(task['state'] == WARMUP_READY for task in tasks.values()),
+            'tasks': tasks
+        }